@@ -10,8 +10,28 @@ a = Analysis(
         'high_res_ascii_painter.painter',
         'high_res_ascii_painter.cli', 
         'high_res_ascii_painter.image_loader',
+        'high_res_ascii_painter.animation',
+        'high_res_ascii_painter.arrays',
         'high_res_ascii_painter.ascii_converter',
+        'high_res_ascii_painter.batch',
+        'high_res_ascii_painter.budget',
+        'high_res_ascii_painter.cache',
+        'high_res_ascii_painter.delta',
+        'high_res_ascii_painter.dither',
+        'high_res_ascii_painter.fetcher',
+        'high_res_ascii_painter.frames',
+        'high_res_ascii_painter.glyphs',
+        'high_res_ascii_painter.client',
+        'high_res_ascii_painter.color',
+        'high_res_ascii_painter.profiling',
+        'high_res_ascii_painter.server',
+        'high_res_ascii_painter.shapes',
+        'high_res_ascii_painter.subcell',
+        'high_res_ascii_painter.tiled',
+        'high_res_ascii_painter.tone',
         'high_res_ascii_painter.utils',
+        'high_res_ascii_painter.variants',
+        'high_res_ascii_painter.watch',
         'high_res_ascii_painter.config',
         'PIL._tkinter_finder',
         'numpy',
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark the legacy per-pixel mapping loop against the lookup-table engine
+
+Usage: python benchmarks/bench_convert.py [image_file] [--color]
+Without an image file a synthetic 1600x1200 gradient is used. In color mode
+only the visible text is compared, since escapes are emitted per color run.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from high_res_ascii_painter.ascii_converter import ASCIIConverter
+from high_res_ascii_painter.config import BRIGHTNESS_OFFSET, GAMMA_CORRECTION
+from high_res_ascii_painter.utils import get_ansi_color, reset_color, strip_ansi_codes
+
+WIDTHS = [70, 150, 300, 600, 1000, 2000]
+
+
+def legacy_convert(converter, img, width):
+    """The original double loop from ASCIIConverter.convert_to_ascii"""
+    img_gray, img_color, final_width, height = converter.prepare_image(img, width)
+    arr_gray = np.array(img_gray)
+    if converter.use_color:
+        arr_color = np.array(img_color)
+    arr_gray = np.clip(arr_gray + BRIGHTNESS_OFFSET, 0, 255)
+
+    ascii_lines = []
+    for i in range(height):
+        line = ""
+        for j in range(final_width):
+            p = arr_gray[i, j]
+            normalized = p / 255.0
+            gamma_corrected = np.power(normalized, GAMMA_CORRECTION)
+            k = int(gamma_corrected * (converter.n - 1))
+            k = min(k, converter.n - 1)
+            char = converter.density[converter.n - 1 - k]
+            if converter.use_color:
+                r, g, b = arr_color[i, j]
+                line += get_ansi_color(r, g, b) + char + reset_color()
+            else:
+                line += char
+        ascii_lines.append(line)
+    return ascii_lines
+
+
+def synthetic_image():
+    """Smooth gradient with some structure, large enough for width 2000"""
+    y, x = np.mgrid[0:1200, 0:1600]
+    r = (x * 255 // 1599).astype(np.uint8)
+    g = (y * 255 // 1199).astype(np.uint8)
+    b = ((np.sin(x / 40.0) * np.cos(y / 30.0) + 1) * 127).astype(np.uint8)
+    return Image.fromarray(np.stack([r, g, b], axis=-1))
+
+
+def best_of(func, repeat):
+    """Return the fastest wall time of several runs and the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    use_color = '--color' in sys.argv
+    positional = [arg for arg in sys.argv[1:] if not arg.startswith('-')]
+    img = Image.open(positional[0]) if positional else synthetic_image()
+    img.load()
+
+    converter = ASCIIConverter(use_color=use_color)
+    print(f"Image: {img.size[0]}x{img.size[1]}, color={use_color}")
+    print(f"{'width':>6} {'legacy (s)':>12} {'lut (s)':>10} {'speedup':>9}  identical")
+    for width in WIDTHS:
+        repeat = 3 if width <= 300 else 1
+        legacy_time, legacy_lines = best_of(lambda: legacy_convert(converter, img, width), repeat)
+        new_time, new_lines = best_of(lambda: converter.convert_to_ascii(img, width), repeat)
+        if use_color:
+            # Color runs are coalesced now, so compare the visible text only
+            identical = [strip_ansi_codes(l) for l in legacy_lines] == [strip_ansi_codes(l) for l in new_lines]
+        else:
+            identical = legacy_lines == new_lines
+        print(f"{width:>6} {legacy_time:>12.4f} {new_time:>10.4f} {legacy_time / new_time:>8.1f}x  {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start import cost of the ascii-painter entry point
+
+Usage: python benchmarks/bench_import.py [--runs N] [--max-ms MS] [--json]
+
+Each scenario runs the CLI in a fresh interpreter under -X importtime and
+sums the cumulative time of every top-level import made by the package.
+Scenarios also list heavy modules they must not import (requests for local
+files, NumPy/PIL for --help and render cache hits). The script exits with
+status 1 when a scenario imports a forbidden module or when the median
+import time of any scenario exceeds --max-ms, so CI can regress against it.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from PIL import Image
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+RUN_MAIN = "import sys; sys.argv = ['ascii-painter'] + sys.argv[1:]; from high_res_ascii_painter import main; main()"
+
+HEAVY_MODULES = ('numpy', 'PIL', 'requests')
+
+
+def parse_importtime(stderr):
+    """
+    Return (total_us, modules) from -X importtime output
+
+    total_us sums the cumulative time of top-level (unindented) imports,
+    excluding the interpreter's own startup imports before the program ran.
+    """
+    total_us = 0
+    modules = set()
+    started = False
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        module = name.strip()
+        modules.add(module.split('.')[0])
+        # Interpreter startup (site, encodings, ...) is logged before our imports
+        if module == 'high_res_ascii_painter':
+            started = True
+        if started and name == ' ' + module:
+            total_us += int(cumulative)
+    return total_us, modules
+
+
+def run_scenario(args, env, cwd):
+    """Run the CLI once under -X importtime and return (total_us, modules)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', RUN_MAIN] + args,
+        capture_output=True, text=True, env=env, cwd=cwd,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ascii-painter {' '.join(args)} failed:\n{result.stdout}{result.stderr}")
+    return parse_importtime(result.stderr)
+
+
+def main():
+    argv = sys.argv[1:]
+    runs = 5
+    max_ms = None
+    if '--runs' in argv:
+        runs = int(argv[argv.index('--runs') + 1])
+    if '--max-ms' in argv:
+        max_ms = float(argv[argv.index('--max-ms') + 1])
+    as_json = '--json' in argv
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        image_path = os.path.join(work_dir, 'gradient.png')
+        Image.linear_gradient('L').resize((400, 300)).save(image_path)
+
+        env = dict(os.environ)
+        env['PYTHONPATH'] = SRC_DIR + os.pathsep + env.get('PYTHONPATH', '')
+        env['XDG_CACHE_HOME'] = os.path.join(work_dir, 'cache')
+
+        # (name, args, modules that must not be imported)
+        scenarios = [
+            ('help', ['--help'], HEAVY_MODULES),
+            ('local_file', [image_path, '70', '--no-cache'], ('requests',)),
+            ('cache_hit', [image_path, '70'], HEAVY_MODULES),
+        ]
+
+        # Fill the render cache so cache_hit measures the warm path
+        run_scenario([image_path, '70'], env, work_dir)
+
+        results = {}
+        failed = False
+        for name, args, forbidden in scenarios:
+            timings = []
+            modules = set()
+            for _ in range(runs):
+                total_us, modules = run_scenario(args, env, work_dir)
+                timings.append(total_us / 1000)
+            median_ms = statistics.median(timings)
+            leaked = sorted(set(forbidden) & modules)
+            over = max_ms is not None and median_ms > max_ms
+            failed = failed or bool(leaked) or over
+            results[name] = {'median_ms': round(median_ms, 2), 'min_ms': round(min(timings), 2),
+                             'forbidden_imports': leaked, 'over_budget': over}
+
+    if as_json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'scenario':<12} {'median (ms)':>12} {'min (ms)':>10}  forbidden imports")
+        for name, result in results.items():
+            flag = '  OVER BUDGET' if result['over_budget'] else ''
+            leaked = ', '.join(result['forbidden_imports']) or '-'
+            print(f"{name:<12} {result['median_ms']:>12.2f} {result['min_ms']:>10.2f}  {leaked}{flag}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
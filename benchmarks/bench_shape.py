@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Compare the cost of --shape matching with the plain density mapping
+
+Usage: python benchmarks/bench_shape.py [--runs N] [--widths W,W,...] [--json]
+
+A synthetic photo-sized image (gradients plus hard-edged shapes) is
+converted with ASCIIConverter.convert_to_ascii in plain and shape mode at
+each width. Times are the median of --runs conversions, reported in
+milliseconds per source megapixel so results from different image sizes
+can be compared. The matching step alone is also timed per thousand cells,
+since it is the only part that grows with the number of glyphs.
+
+Before timing, every glyph set is checked to map a uniform white cell to
+its densest glyph and, with the natural tone, a black cell to its emptiest;
+the benchmark exits with status 1 if one does not.
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from high_res_ascii_painter.ascii_converter import ASCIIConverter  # noqa: E402
+from high_res_ascii_painter.config import SHAPE_CELL_COLS, SHAPE_CELL_ROWS  # noqa: E402
+
+IMAGE_SIZE = (3000, 2000)
+
+
+def make_image(size=IMAGE_SIZE):
+    """Build a test image with smooth gradients and sharp edges"""
+    img = Image.linear_gradient('L').resize(size).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    width, height = size
+    for i in range(12):
+        x, y = width * i // 12, height * (i % 4) // 4
+        draw.ellipse((x, y, x + width // 8, y + height // 5), outline=(255, 255, 255), width=8)
+        draw.line((x, 0, width - x, height), fill=(0, 0, 0), width=6)
+    draw.text((width // 10, height // 2), 'ascii painter', fill=(255, 255, 255))
+    return img
+
+
+def check_extremes(glyph_sets=('slack', 'ascii', 'blocks', 'eighths')):
+    """Return a list of failures of the white and black cell checks"""
+    failures = []
+    for glyphs in glyph_sets:
+        for tone in ('natural', 'slack'):
+            converter = ASCIIConverter(glyphs=glyphs, shape=True, tone=tone)
+            ink = converter.templates.mean(axis=1)
+            expected = [(255, ink.argmax())] + ([(0, ink.argmin())] if tone == 'natural' else [])
+            for value, index in expected:
+                cell = np.full((SHAPE_CELL_ROWS, SHAPE_CELL_COLS), value, dtype=np.uint8)
+                got = converter.map_to_indices(cell)[0, 0]
+                if got != index:
+                    failures.append(f"{glyphs}/{tone}: gray {value} gave {converter.density[got]!r}, "
+                                    f"expected {converter.density[index]!r}")
+    return failures
+
+
+def median_ms(func, runs):
+    """Run func runs times and return the median wall time in milliseconds"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    argv = sys.argv[1:]
+    runs = 5
+    widths = [80, 160, 320]
+    if '--runs' in argv:
+        runs = int(argv[argv.index('--runs') + 1])
+    if '--widths' in argv:
+        widths = [int(w) for w in argv[argv.index('--widths') + 1].split(',')]
+    as_json = '--json' in argv
+
+    failures = check_extremes()
+    if failures:
+        for failure in failures:
+            print(f"Error: {failure}", file=sys.stderr)
+        sys.exit(1)
+
+    img = make_image()
+    img.load()
+    megapixels = img.size[0] * img.size[1] / 1e6
+
+    results = {}
+    for glyphs in ('slack', 'ascii'):
+        plain = ASCIIConverter(glyphs=glyphs)
+        shape = ASCIIConverter(glyphs=glyphs, shape=True)
+        for width in widths:
+            cols, rows = plain.output_size(img, width)
+            img_gray = shape.prepare_image(img, width)[0]
+            arr_sub = np.asarray(img_gray)
+
+            plain_ms = median_ms(lambda: plain.convert_to_ascii(img, width), runs)
+            shape_ms = median_ms(lambda: shape.convert_to_ascii(img, width), runs)
+            match_ms = median_ms(lambda: shape.map_to_indices(arr_sub), runs)
+            results[f"{glyphs}-{width}"] = {
+                'glyphs': len(plain.density),
+                'cells': cols * rows,
+                'plain_ms_per_mp': round(plain_ms / megapixels, 2),
+                'shape_ms_per_mp': round(shape_ms / megapixels, 2),
+                'match_ms_per_kcell': round(match_ms / (cols * rows / 1000), 3),
+            }
+
+    if as_json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{IMAGE_SIZE[0]}x{IMAGE_SIZE[1]} source ({megapixels:.1f} MP), "
+          f"{SHAPE_CELL_COLS}x{SHAPE_CELL_ROWS} sub-pixels per cell, median of {runs}")
+    print(f"{'case':<12} {'glyphs':>6} {'cells':>8} {'plain ms/MP':>12} {'shape ms/MP':>12} "
+          f"{'slowdown':>9} {'match ms/kcell':>15}")
+    for name, result in results.items():
+        slowdown = result['shape_ms_per_mp'] / result['plain_ms_per_mp']
+        print(f"{name:<12} {result['glyphs']:>6} {result['cells']:>8} {result['plain_ms_per_mp']:>12.2f} "
+              f"{result['shape_ms_per_mp']:>12.2f} {slowdown:>8.1f}x {result['match_ms_per_kcell']:>15.3f}")
+
+
+if __name__ == '__main__':
+    main()
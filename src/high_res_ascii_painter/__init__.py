@@ -1,3 +1,7 @@
-from .painter import main
+def main():
+    """Run the ASCII art generator; painter is imported lazily so the client stays light"""
+    from .painter import main as painter_main
+    painter_main()
+
 
 __all__ = ["main"]
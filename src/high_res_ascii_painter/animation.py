@@ -0,0 +1,107 @@
+"""
+Animated image (GIF/APNG) rendering for ASCII art generator
+"""
+
+import sys
+import time
+from PIL import ImageSequence
+from .config import DEFAULT_FRAME_CODEC, DEFAULT_FRAME_DURATION_MS, FRAME_SEPARATOR
+from .delta import DeltaRenderer
+from .utils import clear_screen, hide_cursor, reset_color, show_cursor
+
+
+def iter_frames(img):
+    """
+    Yield (frame, duration_ms) for every frame of an image, one at a time
+
+    Frames are decoded lazily by seeking the same image object, so only the
+    current frame is held in memory. Still images yield a single frame.
+    """
+    for frame in ImageSequence.Iterator(img):
+        duration = frame.info.get('duration') or DEFAULT_FRAME_DURATION_MS
+        yield frame, duration
+
+
+def is_animated(img):
+    """Check whether an image has more than one frame"""
+    return getattr(img, 'is_animated', False) and getattr(img, 'n_frames', 1) > 1
+
+
+def iter_ascii_frames(img, converter, width, trim=False):
+    """Yield (ascii_lines, duration_ms) for every frame, converting as it goes"""
+    for frame, duration in iter_frames(img):
+        yield converter.convert_to_ascii(frame, width, trim=trim), duration
+
+
+def write_animation(img, converter, width, path, trim=False):
+    """
+    Write every frame to a text file, separated by FRAME_SEPARATOR lines
+    Returns the number of frames written.
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for lines, _ in iter_ascii_frames(img, converter, width, trim):
+            if count:
+                f.write(FRAME_SEPARATOR + '\n')
+            f.write('\n'.join(lines))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def write_frame_file(img, converter, width, path, trim=False, codec=DEFAULT_FRAME_CODEC, animate=True):
+    """
+    Write frames as a binary .hraf file (every frame, or only the first
+    unless animate is set); returns the number of frames written
+    """
+    from .frames import FrameWriter
+
+    frames = iter_frames(img) if animate else [(img, 0)]
+    with FrameWriter.for_converter(path, converter, codec) as writer:
+        for frame, duration in frames:
+            indices, arr_color, row_lengths = converter.convert_to_cells(frame, width, trim=trim)
+            writer.write(indices, arr_color, row_lengths, duration)
+    return len(writer.offsets)
+
+
+def play_animation(img, converter, width, trim=False, loop=False, stream=None):
+    """
+    Play an animation in the terminal at the source frame rate
+
+    Frames are drawn in place through a DeltaRenderer, so only the cells
+    that changed since the previous frame are rewritten. Frames whose
+    display slot has already passed are skipped without converting them,
+    so slow terminals fall behind by dropping frames, not by slowing down.
+    Returns (frames_shown, frames_dropped).
+    """
+    stream = stream or sys.stdout
+    shown = 0
+    dropped = 0
+    renderer = DeltaRenderer(converter)
+
+    stream.write(hide_cursor() + clear_screen())
+    try:
+        while True:
+            deadline = time.perf_counter()
+            for frame, duration in iter_frames(img):
+                deadline += duration / 1000.0
+                if time.perf_counter() > deadline:
+                    dropped += 1
+                    continue
+
+                indices, arr_color, _ = converter.convert_to_cells(frame, width, trim=trim)
+                stream.write(renderer.render(indices, arr_color))
+                stream.flush()
+                shown += 1
+
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if not loop:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stream.write(reset_color() + show_cursor())
+        stream.flush()
+    return shown, dropped
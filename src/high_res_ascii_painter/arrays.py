@@ -0,0 +1,234 @@
+"""
+Conversion of NumPy arrays and raw pixel buffers without PIL
+
+Services that already hold decoded frames (NumPy arrays, or raw bytes from
+an upstream decoder, a memoryview or an mmap) can convert them directly:
+buffers are viewed in place with np.frombuffer, and channel order and row
+padding are handled with strided views, so the source pixels are never
+copied. Frames are box-filtered down to the converter's sample grid like
+--tiled does, so results differ slightly from the LANCZOS path.
+
+ArrayConverter is for repeated calls at a fixed frame size: every work and
+output buffer is allocated once, and each call writes into them with
+out= arguments. In text mode without dithering, a call only allocates the
+256-entry histogram and tone tables; shape matching, sub-cell packing and
+dithering still use their own temporaries.
+"""
+
+import numpy as np
+from .tiled import RAW_LAYOUTS, bin_edges
+from .tone import histogram
+
+# Pixel formats of raw buffers: the layouts the tiled reader understands
+PIXEL_FORMATS = tuple(RAW_LAYOUTS)
+
+
+def pixel_array(data, shape=None, pixel_format=None, stride=None):
+    """
+    View pixel data as a uint8 (H, W) gray or (H, W, 3) RGB array without copying
+
+    data is an ndarray or any buffer-protocol object (bytes, bytearray,
+    memoryview, mmap). Arrays are (H, W), (H, W, 3) or (H, W, 4); buffers
+    need shape=(height, width). pixel_format is one of PIXEL_FORMATS and
+    defaults to 'L' or 'RGB'/'RGBA' by channel count for arrays and 'RGB'
+    for buffers. stride is the number of bytes per row of a padded buffer.
+    The result is a view: it changes when the underlying data does.
+    """
+    if isinstance(data, np.ndarray) and shape is None:
+        if data.dtype != np.uint8 or data.ndim not in (2, 3):
+            raise ValueError(f"Expected a uint8 (H, W) or (H, W, C) array, got {data.dtype} {data.shape}")
+        channels = 1 if data.ndim == 2 else data.shape[2]
+        if pixel_format is None:
+            pixel_format = {1: 'L', 3: 'RGB', 4: 'RGBA'}.get(channels)
+        pixels = data if data.ndim == 3 else data[..., None]
+    else:
+        if shape is None:
+            raise ValueError("Raw buffers need shape=(height, width)")
+        pixel_format = pixel_format or 'RGB'
+        if pixel_format not in RAW_LAYOUTS:
+            raise ValueError(f"Unknown pixel format '{pixel_format}'. Choose from: {', '.join(PIXEL_FORMATS)}")
+        height, width = shape
+        bytes_per_pixel = RAW_LAYOUTS[pixel_format][0]
+        stride = stride or width * bytes_per_pixel
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        if buffer.size < (height - 1) * stride + width * bytes_per_pixel:
+            raise ValueError(f"Buffer of {buffer.size} bytes is too small for {width}x{height} {pixel_format}")
+        # Rows start every stride bytes; padding at the end of each row is skipped
+        pixels = np.lib.stride_tricks.as_strided(
+            buffer, (height, width, bytes_per_pixel), (stride, bytes_per_pixel, 1), writeable=False)
+
+    if pixel_format not in RAW_LAYOUTS or RAW_LAYOUTS[pixel_format][0] != pixels.shape[2]:
+        raise ValueError(f"Pixel format '{pixel_format}' does not match {pixels.shape[2]} channels")
+    channel_slice = RAW_LAYOUTS[pixel_format][1]
+    return pixels[..., 0] if channel_slice is None else pixels[..., channel_slice]
+
+
+class ArrayConverter:
+    """
+    Converts frames of one fixed size and pixel format, reusing every buffer
+
+    convert() returns the glyph indices and cell colors as views of
+    internal buffers, which the next call overwrites; copy them to keep
+    them. render_into() writes plain text straight into a caller's buffer.
+    """
+
+    def __init__(self, converter, frame_size, width, pixel_format='RGB'):
+        """frame_size is the source (width, height); width is the output width in characters"""
+        self.converter = converter
+        self.pixel_format = pixel_format
+        self.frame_width, self.frame_height = frame_size
+        self.width, self.height = converter.size_for(frame_size, width)
+        self.height = max(1, self.height)
+        cols, rows = converter.cell_samples
+        grid_width, grid_height = self.width * cols, self.height * rows
+        if grid_width > self.frame_width or grid_height > self.frame_height:
+            raise ValueError(f"A {self.frame_width}x{self.frame_height} frame is smaller than the "
+                             f"{grid_width}x{grid_height} sample grid; use a smaller width")
+        self.channels = 1 if pixel_format == 'L' else 3
+
+        # Box filter: source rows and columns summed into each sample
+        self.row_edges = np.append(bin_edges(self.frame_height, grid_height), self.frame_height)
+        self.col_edges = bin_edges(self.frame_width, grid_width)
+        col_counts = np.diff(np.append(self.col_edges, self.frame_width)).astype(np.uint32)
+        counts = np.diff(self.row_edges).astype(np.uint32)[:, None] * col_counts[None, :]
+        if self.channels == 3:
+            counts = counts[..., None]
+        self.counts = counts
+        self.half_counts = counts // 2
+
+        # Work buffers, sized once
+        channel_shape = () if self.channels == 1 else (3,)
+        self.row_sums = np.empty((grid_height, self.frame_width) + channel_shape, dtype=np.uint32)
+        self.sums = np.empty((grid_height, grid_width) + channel_shape, dtype=np.uint32)
+        self.luma = np.empty((grid_height, grid_width), dtype=np.uint32)
+        self.luma_term = np.empty((grid_height, grid_width), dtype=np.uint32)
+        self.gray = np.empty((grid_height, grid_width), dtype=np.uint8)
+        self.samples = np.empty((grid_height, grid_width) + channel_shape, dtype=np.uint8)
+        self.indices = np.empty((self.height, self.width), dtype=np.uint8)
+
+        # Cell colors: the samples averaged over each cell, or the two halves of a half block
+        self.pairs = getattr(converter, 'pairs', False)
+        self.arr_color = None
+        if converter.use_color:
+            if self.pairs:
+                self.arr_color = np.empty((self.height, self.width, 2, 3), dtype=np.uint8)
+            else:
+                self.arr_color = np.empty((self.height, self.width, 3), dtype=np.uint8)
+                self.color_sums = np.empty((self.height, self.width, self.channels), dtype=np.uint32)
+
+        # Plain text: glyphs as UTF-8 bytes, when they all encode to the same length
+        encoded = [char.encode('utf-8') for char in converter.density]
+        self.glyph_width = len(encoded[0]) if len({len(glyph) for glyph in encoded}) == 1 else None
+        if self.glyph_width:
+            self.glyph_bytes = np.frombuffer(b''.join(encoded), dtype=np.uint8).reshape(-1, self.glyph_width)
+
+    def _box_filter(self, pixels):
+        """Average the frame over each sample into self.samples"""
+        for i, (start, end) in enumerate(zip(self.row_edges[:-1], self.row_edges[1:])):
+            np.sum(pixels[start:end], axis=0, dtype=np.uint32, out=self.row_sums[i])
+        np.add.reduceat(self.row_sums, self.col_edges, axis=1, dtype=np.uint32, out=self.sums)
+        # Divide with rounding by each sample's pixel count
+        np.add(self.sums, self.half_counts, out=self.sums)
+        np.floor_divide(self.sums, self.counts, out=self.sums)
+        np.copyto(self.samples, self.sums, casting='unsafe')
+
+    def _gray(self):
+        """Luminance with PIL's 'L' weights into self.gray; returns the frame's tone curve"""
+        if self.channels == 1:
+            np.copyto(self.luma, self.sums)
+        else:
+            np.multiply(self.sums[..., 0], 19595, out=self.luma)
+            np.multiply(self.sums[..., 1], 38470, out=self.luma_term)
+            np.add(self.luma, self.luma_term, out=self.luma)
+            np.multiply(self.sums[..., 2], 7471, out=self.luma_term)
+            np.add(self.luma, self.luma_term, out=self.luma)
+            np.add(self.luma, 0x8000, out=self.luma)
+            np.right_shift(self.luma, 16, out=self.luma)
+
+        np.copyto(self.gray, self.luma, casting='unsafe')
+        return self.converter.tone_curve(histogram(self.gray))
+
+    def _colors(self):
+        """Cell colors from the RGB samples, into self.arr_color"""
+        samples = self.samples if self.channels == 3 else self.samples[..., None]
+        if self.pairs:
+            # Half blocks sample two rows per cell: the upper and lower colors
+            pairs = samples.reshape(self.height, 2, self.width, -1).transpose(0, 2, 1, 3)
+            np.copyto(self.arr_color, pairs)
+            return
+        cols, rows = self.converter.cell_samples
+        if (cols, rows) == (1, 1):
+            np.copyto(self.arr_color, samples)
+            return
+        cells = samples.reshape(self.height, rows, self.width, cols, -1)
+        np.sum(cells, axis=(1, 3), dtype=np.uint32, out=self.color_sums)
+        np.add(self.color_sums, (rows * cols) // 2, out=self.color_sums)
+        np.floor_divide(self.color_sums, rows * cols, out=self.color_sums)
+        np.copyto(self.arr_color, self.color_sums, casting='unsafe')
+
+    def convert(self, data, stride=None):
+        """
+        Convert one frame; returns (indices, arr_color) views of internal buffers
+
+        data is an ndarray or raw buffer of the size and pixel format given
+        at construction. arr_color is None in plain mode.
+        """
+        pixels = pixel_array(data, (self.frame_height, self.frame_width), self.pixel_format, stride) \
+            if not isinstance(data, np.ndarray) else pixel_array(data, pixel_format=self.pixel_format)
+        if pixels.shape[:2] != (self.frame_height, self.frame_width):
+            raise ValueError(f"Expected a {self.frame_width}x{self.frame_height} frame, "
+                             f"got {pixels.shape[1]}x{pixels.shape[0]}")
+        self._box_filter(pixels)
+        curve = self._gray()
+        if self.arr_color is not None:
+            self._colors()
+
+        converter = self.converter
+        if converter.lut is not None and not converter.dither and not converter.shape:
+            # The tone curve composed with the glyph table: one lookup per sample
+            np.take(converter.lut[curve], self.gray, out=self.indices, mode='clip')
+        else:
+            self.indices[...] = converter.map_to_indices(self.gray, curve)
+        return self.indices, self.arr_color
+
+    def convert_lines(self, data, stride=None, trim=False):
+        """Convert one frame to output lines (allocates the strings)"""
+        indices, arr_color = self.convert(data, stride)
+        row_lengths = None
+        if trim:
+            indices, arr_color, row_lengths = self.converter.trim_indices(indices, arr_color)
+        return self.converter.render_lines(indices, arr_color, row_lengths)
+
+    def text_buffer(self):
+        """Allocate a buffer render_into can fill: every row of glyph bytes plus a newline"""
+        if not self.glyph_width:
+            raise ValueError("Glyphs encode to different UTF-8 lengths; use convert_lines instead")
+        buffer = np.empty((self.height, self.width * self.glyph_width + 1), dtype=np.uint8)
+        buffer[:, -1] = ord('\n')
+        return buffer
+
+    def render_into(self, buffer, data, stride=None):
+        """
+        Convert one frame and write its plain text into buffer (from text_buffer)
+
+        Returns the buffer, whose bytes (buffer.tobytes(), or the buffer
+        itself through the buffer protocol) are the UTF-8 text. Colors are
+        not written: escape sequences have no fixed length.
+        """
+        indices, _ = self.convert(data, stride)
+        glyphs = buffer[:, :-1].reshape(self.height, self.width, self.glyph_width)
+        np.take(self.glyph_bytes, indices, axis=0, out=glyphs, mode='clip')
+        return buffer
+
+
+def convert_array(converter, data, width, shape=None, pixel_format=None, stride=None, trim=False):
+    """
+    Convert one array or raw buffer to output lines
+
+    Takes the same data arguments as pixel_array. For many frames of the
+    same size, create an ArrayConverter once and reuse it.
+    """
+    pixels = pixel_array(data, shape, pixel_format, stride)
+    height, width_px = pixels.shape[:2]
+    pixel_format = 'L' if pixels.ndim == 2 else 'RGB'
+    return ArrayConverter(converter, (width_px, height), width, pixel_format).convert_lines(pixels, trim=trim)
@@ -3,87 +3,247 @@ ASCII art conversion functionality
 """
 
 import numpy as np
-from PIL import Image, ImageEnhance
+from PIL import Image
 from .config import (
-    DENSITY_STRING, 
-    CONTRAST_FACTOR, 
-    BRIGHTNESS_OFFSET, 
-    ASPECT_RATIO_CORRECTION, 
-    GAMMA_CORRECTION
+    ASPECT_RATIO_CORRECTION,
+    DEFAULT_PALETTE,
+    DEFAULT_COLOR_BITS,
+    DEFAULT_GLYPH_SET,
+    DEFAULT_TONE,
+    SHAPE_CELL_COLS,
+    SHAPE_CELL_ROWS,
+    STREAM_BLOCK_ROWS,
+    TONE_PRESETS
 )
-from .utils import get_ansi_color, reset_color
+from .cache import render_params
+from .color import render_color_lines
+from .dither import apply_dither
+from .glyphs import glyph_ink_table, glyph_set, glyph_templates, lut_levels
+from .profiling import stage
+from .shapes import ink_table, match_shapes
+from .tone import build_tone_curve, histogram
+from .utils import background_characters, content_bounds
+
+
+def luminance(arr_color):
+    """Convert an (h, w, 3) uint8 RGB array to gray using PIL's 'L' weights and rounding"""
+    rgb = arr_color.astype(np.uint32)
+    gray = (rgb[..., 0] * 19595 + rgb[..., 1] * 38470 + rgb[..., 2] * 7471 + 0x8000) >> 16
+    return gray.astype(np.uint8)
+
+
+def glyph_rows(codepoints, indices):
+    """Build one string per row of a non-empty glyph-index matrix from the glyph code points"""
+    # Each row of code points reinterpreted as one fixed-width string
+    rows = np.ascontiguousarray(codepoints[indices])
+    return rows.view(np.dtype(('U', indices.shape[1]))).ravel().tolist()
 
 
 class ASCIIConverter:
     """Handles conversion of images to ASCII art"""
-    
-    def __init__(self, use_color=False):
+
+    def __init__(self, use_color=False, palette=DEFAULT_PALETTE, color_bits=DEFAULT_COLOR_BITS,
+                 glyphs=DEFAULT_GLYPH_SET, shape=False, dither=None, tone=DEFAULT_TONE):
+        if tone not in TONE_PRESETS:
+            raise ValueError(f"Unknown tone preset '{tone}'. Choose from: {', '.join(TONE_PRESETS)}")
         self.use_color = use_color
-        self.density = DENSITY_STRING
+        self.palette = palette
+        self.color_bits = color_bits
+        self.glyphs = glyphs
+        self.shape = shape
+        self.dither = dither
+        self.tone = tone
+        self.tone_preset = TONE_PRESETS[tone]
+        brightness, gamma = self.tone_preset['brightness'], self.tone_preset['gamma']
+        # Ramp from darkest to lightest glyph and the gray value -> ramp index table
+        self.density, self.lut = glyph_set(glyphs, brightness, gamma)
         self.n = len(self.density)
-    
-    def prepare_image(self, img, width):
-        """Prepare image for ASCII conversion by resizing and enhancing"""
-        # Convert to appropriate color mode
-        if self.use_color:
-            img_color = img.convert('RGB')
-            img_gray = img.convert('L')
-        else:
-            img_gray = img.convert('L')
-        
-        # Enhance contrast and brightness for better ASCII conversion
-        enhancer = ImageEnhance.Contrast(img_gray)
-        img_gray = enhancer.enhance(CONTRAST_FACTOR)
-        
-        # Resize the image as required with better resampling
-        orig_width, orig_height = img_gray.size
+        # Per-glyph sub-pixel bitmaps and target ink, used instead of the table in shape mode
+        self.templates = glyph_templates(self.density, SHAPE_CELL_COLS, SHAPE_CELL_ROWS) if shape else None
+        self.shape_ink = ink_table(brightness, gamma) if shape else None
+        # Gray samples taken across and down each cell
+        self.cell_samples = (SHAPE_CELL_COLS, SHAPE_CELL_ROWS) if shape else (1, 1)
+        if dither and shape:
+            raise ValueError("Dithering cannot be combined with shape matching")
+        # For dithering: the brightness the table quantizes, and the level each glyph stands for
+        if dither:
+            self.ink = glyph_ink_table(brightness, gamma).astype(np.float32)
+            self.levels, self.level_indices = lut_levels(self.lut, self.n, brightness, gamma)
+        # Code points of the density string, so rows can be built as whole
+        # numpy unicode strings instead of per-character concatenation
+        self.codepoints = np.array([ord(c) for c in self.density], dtype=np.uint32)
+        background = background_characters(self.density)
+        self.background_indices = [i for i, c in enumerate(self.density) if c in background]
+
+    def cache_params(self, width, trim=False):
+        """Return every setting that affects the rendered output, for cache keys"""
+        return render_params(width, trim, self.use_color, self.palette, self.color_bits, self.glyphs,
+                             self.shape, dither=self.dither, tone=self.tone)
+
+    def output_size(self, img, width):
+        """Return the (width, height) in characters for an image at the given width"""
+        return self.size_for(img.size, width)
+
+    def size_for(self, size, width):
+        """Return the (width, height) in characters for a source of the given (width, height)"""
+        orig_width, orig_height = size
         r = orig_height / orig_width
         # The ASCII character glyphs are taller than they are wide. Maintain the aspect
         # ratio by reducing the image height. Optimized for Slack's font rendering.
         height = int(width * r * ASPECT_RATIO_CORRECTION)
-        img_gray = img_gray.resize((width, height), Image.Resampling.LANCZOS)
-        
-        if self.use_color:
+        return width, height
+
+    def enhance(self, img):
+        """
+        Return the gray image that is resampled to the cell grid
+
+        Tone adjustments are not applied here: they are one curve built
+        from the downscaled image and folded into the glyph lookup.
+        """
+        return img.convert('L')
+
+    def tone_curve(self, hist):
+        """Return the uint8 tone curve for an image with the given gray histogram"""
+        return build_tone_curve(hist, self.tone_preset)
+
+    def resample(self, img_gray, img_color, width, height):
+        """
+        Resize a gray image to cell_samples per cell, and an RGB image (if
+        given) to one pixel per cell; returns (img_gray, img_color)
+        """
+        cols, rows = self.cell_samples
+        img_gray = img_gray.resize((width * cols, height * rows), Image.Resampling.LANCZOS)
+        if img_color is not None:
             img_color = img_color.resize((width, height), Image.Resampling.LANCZOS)
-            return img_gray, img_color, width, height
-        else:
-            return img_gray, None, width, height
-    
-    def convert_to_ascii(self, img, width):
-        """Convert image to ASCII art"""
-        img_gray, img_color, final_width, height = self.prepare_image(img, width)
-        
-        # Convert to numpy arrays
-        arr_gray = np.array(img_gray)
+        return img_gray, img_color
+
+    def prepare_image(self, img, width, source_size=None):
+        """
+        Prepare image for ASCII conversion by resizing it to the cell grid
+
+        In shape mode the gray image keeps SHAPE_CELL_COLS x SHAPE_CELL_ROWS
+        samples per cell, while the color image is still one pixel per cell.
+        source_size sets the (width, height) the grid is computed from, for
+        images that are reduced copies of a larger source.
+        """
+        width, height = self.size_for(source_size or img.size, width)
+
+        if self.use_color and self.cell_samples == (1, 1):
+            # Resize the RGB image once and derive everything else from the small copy
+            img_color = img if img.mode == 'RGB' else img.convert('RGB')
+            img_color = img_color.resize((width, height), Image.Resampling.LANCZOS)
+            return Image.fromarray(luminance(np.asarray(img_color))), img_color, width, height
+
+        img_color = None
         if self.use_color:
-            arr_color = np.array(img_color)
-        
-        # Apply brightness offset
-        arr_gray = np.clip(arr_gray + BRIGHTNESS_OFFSET, 0, 255)
-        
-        # Generate ASCII art lines
-        ascii_lines = []
-        for i in range(height):
-            line = ""
-            for j in range(final_width):
-                p = arr_gray[i, j]
-                # Optimized mapping for Slack's limited character set
-                # Use simpler mapping that works better with fewer characters
-                normalized = p / 255.0
-                # Apply stronger gamma correction for better contrast with limited characters
-                gamma_corrected = np.power(normalized, GAMMA_CORRECTION)
-                # Map to density index with better precision
-                k = int(gamma_corrected * (self.n - 1))
-                k = min(k, self.n - 1)  # Ensure we don't exceed bounds
-                
-                char = self.density[self.n - 1 - k]
-                
-                if self.use_color:
-                    # Get RGB color for this pixel
-                    r, g, b = arr_color[i, j]
-                    line += get_ansi_color(r, g, b) + char + reset_color()
-                else:
-                    line += char
-            ascii_lines.append(line)
-        
-        return ascii_lines
+            img_color = img if img.mode == 'RGB' else img.convert('RGB')
+
+        # Resize with better resampling; tone is applied to the small image afterwards
+        img_gray, img_color = self.resample(self.enhance(img), img_color, width, height)
+        return img_gray, img_color, width, height
+
+    def map_to_indices(self, arr_gray, curve=None):
+        """
+        Map a 2D uint8 gray array to a matrix of density string indices
+
+        curve is the tone curve to apply, built from the array's own
+        histogram when not given. It is composed with the glyph table, so
+        the array is read through a single 256-entry lookup.
+
+        In shape mode the array holds a block of sub-pixels per cell, which
+        is matched against the glyph templates. With dithering, each cell is
+        quantized to the glyph levels with the chosen method instead of the
+        table.
+        """
+        if curve is None:
+            curve = self.tone_curve(histogram(arr_gray))
+        if self.shape:
+            return match_shapes(arr_gray, self.templates, ink=self.shape_ink[curve])
+        if self.dither:
+            return self.level_indices[apply_dither(self.ink[curve][arr_gray], self.levels, self.dither)]
+        return self.lut[curve][arr_gray]
+
+    def trim_indices(self, indices, arr_color=None):
+        """
+        Crop background-only rows and columns from a glyph-index matrix
+
+        Returns the cropped indices and colors plus the length of each row
+        once its trailing background cells are dropped.
+        """
+        content = np.isin(indices, self.background_indices, invert=True)
+        bounds = content_bounds(content)
+        if bounds is None:
+            empty = indices[:0, :0]
+            return empty, None if arr_color is None else arr_color[:0, :0], np.zeros(0, dtype=np.intp)
+        row_slice, col_slice, row_lengths = bounds
+        if arr_color is not None:
+            arr_color = arr_color[row_slice, col_slice]
+        return indices[row_slice, col_slice], arr_color, row_lengths
+
+    def render_lines(self, indices, arr_color=None, row_lengths=None):
+        """Build output lines from a glyph-index matrix, optionally cut to row_lengths"""
+        height, width = indices.shape
+        if height == 0 or width == 0:
+            return [''] * height
+
+        rows = glyph_rows(self.codepoints, indices)
+        if not self.use_color:
+            if row_lengths is not None:
+                rows = [row[:length] for row, length in zip(rows, row_lengths.tolist())]
+            return rows
+        return render_color_lines(rows, arr_color, self.palette, self.color_bits, row_lengths)
+
+    def convert_to_cells(self, img, width, trim=False):
+        """
+        Convert image to per-cell output without building strings
+
+        Returns (indices, arr_color, row_lengths): the glyph-index matrix, the
+        matching RGB array (None in plain mode) and, when trimming, the length
+        of each row once trailing background is dropped (otherwise None).
+        """
+        with stage('prepare_image'):
+            img_gray, img_color, final_width, height = self.prepare_image(img, width)
+        return self.map_prepared(img_gray, img_color, trim)
+
+    def map_prepared(self, img_gray, img_color, trim=False):
+        """Map images resampled to the cell grid to (indices, arr_color, row_lengths)"""
+        # Convert to numpy arrays
+        arr_gray = np.asarray(img_gray)
+        arr_color = np.asarray(img_color) if self.use_color else None
+
+        with stage('mapping'):
+            indices = self.map_to_indices(arr_gray)
+        row_lengths = None
+        if trim:
+            with stage('trim'):
+                indices, arr_color, row_lengths = self.trim_indices(indices, arr_color)
+        return indices, arr_color, row_lengths
+
+    def convert_to_ascii(self, img, width, trim=False):
+        """Convert image to ASCII art, removing background rows and columns if trim is set"""
+        indices, arr_color, row_lengths = self.convert_to_cells(img, width, trim)
+        with stage('render'):
+            return self.render_lines(indices, arr_color, row_lengths)
+
+    def iter_ascii_lines(self, img, width, trim=False, block_rows=STREAM_BLOCK_ROWS):
+        """
+        Convert image to ASCII art, returning an iterator over the output lines
+
+        The image is resized, mapped and trimmed up front, which only needs
+        the small glyph-index matrix. Strings are then built block_rows rows
+        at a time as the iterator is consumed, so wide renders can be
+        streamed without holding every line at once.
+        """
+        indices, arr_color, row_lengths = self.convert_to_cells(img, width, trim)
+        return self._iter_rendered(indices, arr_color, row_lengths, block_rows)
+
+    def _iter_rendered(self, indices, arr_color, row_lengths, block_rows):
+        for start in range(0, indices.shape[0], block_rows):
+            block = slice(start, start + block_rows)
+            with stage('render'):
+                lines = self.render_lines(
+                    indices[block],
+                    None if arr_color is None else arr_color[block],
+                    None if row_lengths is None else row_lengths[block],
+                )
+            yield from lines
@@ -0,0 +1,152 @@
+"""
+Batch conversion of many images across a process pool
+"""
+
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .image_loader import check_image_content_type, load_image, load_image_from_bytes
+from .subcell import create_converter
+from .utils import write_lines
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.tif', '.tiff')
+
+# Converters are reused by every task a worker process runs
+_converters = {}
+
+
+def collect_sources(patterns, is_web=False):
+    """
+    Expand batch sources into a list of images
+
+    Each pattern may be a directory (all images inside it), a glob pattern,
+    a single file, or '-' to read one source per line from stdin.
+    """
+    sources = []
+    for pattern in patterns:
+        if pattern == '-':
+            sources.extend(line.strip() for line in sys.stdin if line.strip())
+        elif is_web:
+            sources.append(pattern)
+        elif os.path.isdir(pattern):
+            for name in sorted(os.listdir(pattern)):
+                path = os.path.join(pattern, name)
+                if os.path.isfile(path) and name.lower().endswith(IMAGE_EXTENSIONS):
+                    sources.append(path)
+        elif glob.has_magic(pattern):
+            sources.extend(sorted(path for path in glob.glob(pattern) if os.path.isfile(path)))
+        else:
+            sources.append(pattern)
+    return sources
+
+
+def output_paths(sources, output_dir):
+    """Derive one unique .txt output path per source"""
+    paths = []
+    used = set()
+    for source in sources:
+        stem = os.path.splitext(os.path.basename(source.rstrip('/')))[0] or 'image'
+        name = stem
+        counter = 1
+        while name in used:
+            name = f"{stem}_{counter}"
+            counter += 1
+        used.add(name)
+        paths.append(os.path.join(output_dir, name + '.txt'))
+    return paths
+
+
+def _get_converter(options):
+    """Return a converter for the given options, cached per worker process"""
+    key = tuple(sorted(options.items()))
+    converter = _converters.get(key)
+    if converter is None:
+        converter = _converters[key] = create_converter(**options)
+    return converter
+
+
+def _render_task(task):
+    """Load, convert and write a single image; runs inside a worker process"""
+    source, data, output_path, width, trim, exact, options = task
+    target_width = None if exact else width
+    try:
+        if data is not None:
+            img = load_image_from_bytes(data, target_width)
+        else:
+            img = load_image(source, False, target_width)
+        lines = _get_converter(options).iter_ascii_lines(img, width, trim=trim)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            write_lines(lines, f)
+        return source, None
+    except SystemExit:
+        # load_image reports its own errors and exits; keep the worker alive
+        return source, "could not load image"
+    except Exception as e:
+        return source, str(e)
+
+
+def run_batch(patterns, output_dir, width, is_web=False, trim=False, exact=False, workers=None,
+              chunk_size=1, **converter_options):
+    """
+    Convert every image matched by patterns and write the results to output_dir
+
+    Loading and conversion fan out over a ProcessPoolExecutor so interpreter,
+    NumPy and PIL startup is paid once per worker instead of once per image.
+    Returns the number of images that failed, or 1 when the patterns match
+    no images, so an empty glob fails like a failed conversion.
+    """
+    sources = collect_sources(patterns, is_web)
+    if not sources:
+        print("Error: No images found for batch conversion")
+        return 1
+
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    failures = []
+    tasks = []
+    paths = output_paths(sources, output_dir)
+    if is_web:
+        # Download concurrently over the shared connection pool, then hand
+        # the bytes to the workers so they only decode and convert
+        from .fetcher import HTTPCache, fetch_many
+        print(f"Downloading {len(sources)} images...")
+        downloads = fetch_many(sources, cache=HTTPCache())
+        for (source, data, content_type, error), path in zip(downloads, paths):
+            if error is None:
+                # Same check as single downloads, so an HTML error page is not handed to PIL
+                try:
+                    check_image_content_type(content_type)
+                except ValueError as e:
+                    error = e
+            if error is not None:
+                failures.append((source, str(error)))
+            else:
+                tasks.append((source, data, path, width, trim, exact, converter_options))
+    else:
+        tasks = [
+            (source, None, path, width, trim, exact, converter_options)
+            for source, path in zip(sources, paths)
+        ]
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(tasks)))
+
+    print(f"Converting {len(tasks)} images with {workers} worker(s)...")
+    if workers == 1:
+        results = map(_render_task, tasks)
+        failures.extend((source, error) for source, error in results if error)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_render_task, tasks, chunksize=chunk_size)
+            failures.extend((source, error) for source, error in results if error)
+    elapsed = time.perf_counter() - start
+
+    for source, error in failures:
+        print(f"Failed: {source}: {error}")
+    converted = len(sources) - len(failures)
+    rate = converted / elapsed if elapsed > 0 else float('inf')
+    print(f"Converted {converted}/{len(sources)} images in {elapsed:.2f}s "
+          f"({rate:.1f} images/sec) -> {output_dir}")
+    return len(failures)
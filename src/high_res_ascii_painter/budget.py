@@ -0,0 +1,125 @@
+"""
+Fit the output width to a size budget
+
+Slack code blocks have a hard message length limit, and the size of a
+render depends on the image, trimming and color escapes, so the widest
+width that fits can only be found by rendering. The source is converted to
+the mode prepare_image starts from and resized once to a working image a
+little larger than the widest candidate; each candidate width then only
+resamples that small copy, maps and renders it, and a binary search finds
+the widest estimate that fits. Resampling twice is not exactly a direct
+render, so the chosen width is then rendered the way a plain run at that
+width would be; if the real output does not fit, the widths below it are
+binary searched with real renders. The reported width therefore
+reproduces its output when run on its own.
+"""
+
+from PIL import Image
+from .config import BUDGET_OVERSAMPLE
+
+
+def rendered_size(lines, count_bytes=True):
+    """Size of lines as written out (each followed by a newline), in UTF-8 bytes or characters"""
+    if count_bytes:
+        return sum(len(line.encode('utf-8')) + 1 for line in lines)
+    return sum(len(line) + 1 for line in lines)
+
+
+def working_image(converter, img, max_width):
+    """
+    Return img converted once to the mode prepare_image starts from (RGB in
+    color mode, the enhanced gray image otherwise) and resized to
+    BUDGET_OVERSAMPLE times the sample grid of the widest candidate, or
+    left at the source size if smaller
+    """
+    cols, rows = converter.cell_samples
+    # Color half blocks sample two pixel rows per cell even when the gray grid does not
+    rows = max(rows, 2)
+    _, max_height = converter.output_size(img, max_width)
+    size = (min(img.size[0], max_width * cols * BUDGET_OVERSAMPLE),
+            min(img.size[1], max(1, max_height) * rows * BUDGET_OVERSAMPLE))
+
+    if converter.use_color:
+        work = img if img.mode == 'RGB' else img.convert('RGB')
+    else:
+        work = converter.enhance(img)
+    if work.size != size:
+        work = work.resize(size, Image.Resampling.LANCZOS)
+    return work
+
+
+def widest(fits, low, high):
+    """Binary search low..high for the widest width where fits(width) holds, or None"""
+    best = None
+    while low <= high:
+        width = (low + high) // 2
+        if fits(width):
+            best, low = width, width + 1
+        else:
+            high = width - 1
+    return best
+
+
+def fit_width(converter, img, max_width, max_bytes=None, max_chars=None, trim=False, render=None):
+    """
+    Find the widest render of img, up to max_width, within the byte and character budgets
+
+    Returns (width, lines, size) where size is the rendered size in bytes
+    (or characters when only max_chars is given). Raises ValueError when
+    even a one-column render is over budget.
+
+    render(width) returns the lines of a direct render at width, used to
+    settle the final width; by default img is converted at that width.
+    Pass one that decodes the source for the width when img was decoded at
+    a reduced scale, so the result matches a plain run.
+
+    Size grows with width almost everywhere but not strictly (trimming and
+    merged color runs can shrink a wider render), so the search returns a
+    width that fits, not always the widest one.
+    """
+    if render is None:
+        def render(width):
+            return converter.convert_to_ascii(img, width, trim)
+
+    def measure(lines):
+        size_bytes = rendered_size(lines)
+        size_chars = rendered_size(lines, count_bytes=False)
+        fits = ((max_bytes is None or size_bytes <= max_bytes)
+                and (max_chars is None or size_chars <= max_chars))
+        return fits, size_bytes if max_bytes is not None else size_chars
+
+    def has_rows(width):
+        # Narrow widths of wide images round to a grid with no rows, which cannot be rendered
+        return converter.output_size(img, width)[1] > 0
+
+    work = working_image(converter, img, max_width)
+
+    def estimate(width):
+        if not has_rows(width):
+            return False
+        # The grid comes from the source size, as in a direct render
+        img_gray, img_color, _, _ = converter.prepare_image(work, width, img.size)
+        fits, _ = measure(converter.render_lines(*converter.map_prepared(img_gray, img_color, trim)))
+        return fits
+
+    results = {}
+
+    def exact(width):
+        if not has_rows(width):
+            return False
+        lines = render(width)
+        fits, size = measure(lines)
+        if fits:
+            results[width] = width, lines, size
+        return fits
+
+    best = max_width if estimate(max_width) else widest(estimate, 1, max_width - 1)
+    # Settle on the width with real renders: the estimate usually fits as is,
+    # otherwise the real renders are searched below it the same way
+    if best is not None and not exact(best):
+        best = widest(exact, 1, best - 1)
+    if best is None:
+        limits = [f"{max_bytes} bytes" if max_bytes is not None else None,
+                  f"{max_chars} characters" if max_chars is not None else None]
+        raise ValueError(f"Even a 1-column render is larger than {' and '.join(l for l in limits if l)}")
+    return results[best]
@@ -0,0 +1,230 @@
+"""
+Content-addressed on-disk cache of rendered ASCII art
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from .config import (
+    CACHE_DIR,
+    CACHE_MAX_BYTES,
+    GLYPH_SETS,
+    DEFAULT_GLYPH_SET,
+    DEFAULT_RENDER_MODE,
+    DEFAULT_TONE,
+    TONE_PRESETS,
+    ASPECT_RATIO_CORRECTION,
+    SHAPE_CELL_COLS,
+    SHAPE_CELL_ROWS,
+    BAYER_ORDER,
+    DEFAULT_PALETTE,
+    DEFAULT_COLOR_BITS
+)
+
+# Bump when a change to the rendering pipeline makes old entries stale
+CACHE_VERSION = 4
+
+STATS_FILE = 'stats.json'
+
+
+def render_params(width, trim=False, use_color=False, palette=DEFAULT_PALETTE,
+                  color_bits=DEFAULT_COLOR_BITS, glyphs=DEFAULT_GLYPH_SET, shape=False,
+                  mode=DEFAULT_RENDER_MODE, dither=None, tone=DEFAULT_TONE):
+    """
+    Return every setting that affects the rendered output, for cache keys
+    Kept free of NumPy/PIL so a cache hit can be served without importing them.
+    """
+    return {
+        'width': width,
+        'trim': trim,
+        'color': use_color,
+        'palette': palette if use_color else None,
+        'color_bits': color_bits if use_color else None,
+        'mode': mode,
+        'glyphs': glyphs,
+        'charset': GLYPH_SETS[glyphs],
+        'shape': [SHAPE_CELL_COLS, SHAPE_CELL_ROWS] if shape else None,
+        'dither': [dither, BAYER_ORDER] if dither == 'bayer' else dither,
+        'tone': [tone, TONE_PRESETS[tone]],
+        'aspect_ratio': ASPECT_RATIO_CORRECTION,
+    }
+
+
+class RenderCache:
+    """
+    Stores rendered lines keyed on the source image bytes and every parameter
+    that affects output. Entries are evicted least recently used first once
+    the cache grows past max_bytes.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._saved = (0, 0)
+        # The render server looks entries up from several worker threads
+        self._counters_lock = threading.Lock()
+
+    def make_key(self, source_bytes, params):
+        """Hash the source image bytes together with the render parameters"""
+        digest = hashlib.sha256()
+        digest.update(hashlib.sha256(source_bytes).digest())
+        digest.update(json.dumps({'version': CACHE_VERSION, **params}, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.txt')
+
+    def get(self, key):
+        """Return the cached lines for key, or None on a miss"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            with self._counters_lock:
+                self.misses += 1
+            return None
+
+        # Refresh the modification time so eviction treats it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._counters_lock:
+            self.hits += 1
+        return text.split('\n') if text else []
+
+    def put(self, key, lines):
+        """Store rendered lines under key and evict old entries if needed"""
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines))
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def put_iter(self, key, lines):
+        """
+        Yield lines while writing them to the cache entry for key
+
+        The entry is only committed once every line has passed through, so a
+        partially consumed iterator never leaves a truncated entry behind. A
+        failing write disables caching for this render without interrupting
+        the output.
+        """
+        path = self._entry_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            f = os.fdopen(fd, 'w', encoding='utf-8')
+        except OSError as e:
+            print(f"Warning: Failed to write render cache: {e}")
+            yield from lines
+            return
+
+        separator = ''
+        try:
+            for line in lines:
+                if f is not None:
+                    try:
+                        f.write(separator + line)
+                    except OSError as e:
+                        print(f"Warning: Failed to write render cache: {e}")
+                        f.close()
+                        f = None
+                    separator = '\n'
+                yield line
+            if f is not None:
+                try:
+                    f.close()
+                    f = None
+                    os.replace(temp_path, path)
+                    self.evict()
+                except OSError as e:
+                    print(f"Warning: Failed to write render cache: {e}")
+        finally:
+            # Closed early, failed, or already committed (then nothing is left to remove)
+            if f is not None:
+                f.close()
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+    def _entries(self):
+        """List (mtime, size, path) for every cache entry"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.txt'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        """Delete every cache entry and the stored counters"""
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+        with self._counters_lock:
+            self.hits = 0
+            self.misses = 0
+            self._saved = (0, 0)
+
+    def load_stats(self):
+        """Return the hit/miss totals accumulated across runs"""
+        try:
+            with open(os.path.join(self.directory, STATS_FILE), 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            stats = {}
+        return {'hits': stats.get('hits', 0), 'misses': stats.get('misses', 0)}
+
+    def save_stats(self):
+        """Add this instance's unsaved hits and misses to the stored totals"""
+        stats = self.load_stats()
+        with self._counters_lock:
+            stats['hits'] += self.hits - self._saved[0]
+            stats['misses'] += self.misses - self._saved[1]
+            self._saved = (self.hits, self.misses)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, STATS_FILE), 'w', encoding='utf-8') as f:
+                json.dump(stats, f)
+        except OSError:
+            pass
+        return stats
@@ -3,7 +3,29 @@ Command line interface for ASCII art generator
 """
 
 import sys
-from .config import DEFAULT_WIDTH
+from .config import (
+    DEFAULT_WIDTH,
+    DEFAULT_PALETTE,
+    DEFAULT_COLOR_BITS,
+    PALETTES,
+    GLYPH_SETS,
+    DEFAULT_GLYPH_SET,
+    RENDER_MODES,
+    DEFAULT_RENDER_MODE,
+    DITHER_METHODS,
+    TONE_PRESETS,
+    DEFAULT_TONE,
+    SHAPE_CELL_COLS,
+    SHAPE_CELL_ROWS,
+    DEFAULT_BATCH_OUTPUT_DIR,
+    DEFAULT_BATCH_CHUNK_SIZE,
+    DEFAULT_SERVER_HOST,
+    DEFAULT_SERVER_PORT,
+    DEFAULT_SERVER_QUEUE_SIZE,
+    FRAME_CODECS,
+    DEFAULT_FRAME_CODEC
+)
+from .variants import parse_variants
 
 
 def print_help():
@@ -12,6 +34,8 @@ def print_help():
     print("Usage: python painter.py <image_file> [width] [options]")
     print("       python painter.py -w <image_url> [width] [options]")
     print("       python painter.py --clip [width] [options]")
+    print("       python painter.py --batch <dir|glob|-> [width] [options]")
+    print("       python painter.py --serve [--port N] [--workers N] [--queue-size N]")
     print()
     print("Arguments:")
     print("  image_file    Path to the input image file")
@@ -24,6 +48,45 @@ def print_help():
     print("  -a, --auto-copy  Copy ASCII art result to clipboard automatically")
     print("  --color, -c   Enable colored output (not recommended for Slack)")
     print("  --trim, -t    Remove background-only rows and columns for compact output")
+    print("  --palette P   Color palette for --color: truecolor (default), 256 or 16")
+    print("  --color-bits N  Bits kept per channel in truecolor mode (1-8, default: 8)")
+    print(f"  --glyphs NAME Character ramp: {', '.join(GLYPH_SETS)} (default: {DEFAULT_GLYPH_SET})")
+    print(f"  --mode M      Cell rendering: {', '.join(RENDER_MODES)} (default: {DEFAULT_RENDER_MODE})")
+    print("                (half, quadrant and braille pack 2, 4 and 8 sub-pixels into each character)")
+    print(f"  --dither M    Dither between glyph levels: {', '.join(DITHER_METHODS)}")
+    print("                (smooths banding in gradients; works with every --mode, not with --shape)")
+    print(f"  --tone NAME   Tone curve preset: {', '.join(TONE_PRESETS)} (default: {DEFAULT_TONE})")
+    print("                (auto stretches levels, equalize flattens the histogram)")
+    print(f"  --shape       Match each cell's {SHAPE_CELL_COLS}x{SHAPE_CELL_ROWS} sub-pixel pattern to glyph bitmaps")
+    print("                (sharper edges at small widths, slower; not with --tiled)")
+    print("  --max-bytes N Pick the widest width (up to the width argument) whose output fits in N bytes")
+    print("  --max-chars N Same, counting characters (Slack limits message length in characters)")
+    print("  --variants LIST  Render several variants from one decode into --output-dir, with a manifest")
+    print("                (comma-separated WIDTH[:FLAG...]; flags: a --mode, color/mono, trim/full)")
+    print("  --batch, -b   Convert many images: directories, glob patterns, or '-' for a list on stdin")
+    print(f"  --output-dir DIR  Batch and --variants output directory (default: {DEFAULT_BATCH_OUTPUT_DIR})")
+    print("  --workers N   Batch worker processes (default: CPU count)")
+    print(f"  --chunk-size N  Images sent to a worker at a time (default: {DEFAULT_BATCH_CHUNK_SIZE})")
+    print("  --animate     Play animated GIF/APNG frames in the terminal (Ctrl+C to stop)")
+    print("  --loop        Repeat the animation until interrupted")
+    print("  --watch       Redraw in place whenever the image file changes ([+/-] width, [t] trim, [q] quit)")
+    print("  --output, -o FILE  Write the result to FILE instead of the terminal")
+    print("                (with --animate, all frames are written, separated by form feeds)")
+    print("                (a .hraf FILE stores compact binary frames instead of text)")
+    print(f"  --frame-codec C  Compression of .hraf frames: {', '.join(FRAME_CODECS)} (default: {DEFAULT_FRAME_CODEC})")
+    print("  --frame N     With a .hraf source, print only frame N (0-based) instead of every frame")
+    print("  --exact       Decode images at full resolution (slower, skips reduced JPEG/box decoding)")
+    print("  --tiled       Read huge images in strips with bounded memory and stream the rows out")
+    print("                (strips read straight from .npy, PPM/PGM, BMP and uncompressed TIFF; never cached)")
+    print("  --no-cache    Bypass the on-disk render cache")
+    print("  --profile[=json]  Print per-stage time and peak memory to stderr (table or JSON)")
+    print("  --clear-cache Delete all cached renders (can be used without an image)")
+    print("  --cache-stats Print render cache hit/miss counters")
+    print("  --serve       Run a local render server that keeps converters and caches warm")
+    print(f"  --host HOST   Server address for --serve and ascii-painter-client (default: {DEFAULT_SERVER_HOST})")
+    print(f"  --port N      Server port for --serve and ascii-painter-client (default: {DEFAULT_SERVER_PORT})")
+    print(f"  --queue-size N  Requests --serve queues before rejecting with 503 (default: {DEFAULT_SERVER_QUEUE_SIZE})")
+    print("                (--workers sets the number of server render threads)")
     print("  --help, -h    Show this help message")
     print()
     print("Slack Usage Tips:")
@@ -49,6 +112,24 @@ def print_help():
     print("  python painter.py image.jpg 70 -a --trim")
     print("  python painter.py --web https://imgur.com/image.jpg --trim")
     print("  python painter.py image.jpg 80 --trim --color")
+    print("  python painter.py image.jpg 80 --color --palette 256")
+    print("  python painter.py image.jpg 100 --glyphs ascii")
+    print("  python painter.py logo.png 40 --shape --glyphs ascii")
+    print("  python painter.py photo.jpg 80 --mode braille")
+    print("  python painter.py photo.jpg 80 --mode half --color")
+    print("  python painter.py sky.jpg 70 --dither floyd-steinberg")
+    print("  python painter.py foggy.jpg 80 --tone auto")
+    print("  python painter.py photo.jpg 300 --trim --max-chars 4000")
+    print("  python painter.py upload.png --variants 60:trim,120,60:color,120:braille:color")
+    print("  python painter.py --batch thumbnails/ 60 --trim --workers 8")
+    print("  python painter.py scan.tif 200 --tiled -o map.txt")
+    print("  python painter.py animation.gif 60 --animate --loop")
+    print("  python painter.py animation.gif 60 --animate -o frames.txt")
+    print("  python painter.py animation.gif 60 --animate --color -o frames.hraf")
+    print("  python painter.py frames.hraf --frame 12")
+    print("  python painter.py design.png 80 --watch")
+    print("  find . -name '*.png' | python painter.py --batch - 60 --output-dir out")
+    print("  python painter.py --serve --workers 4 &  ascii-painter-client image.jpg 60 --trim")
 
 
 class ArgumentParser:
@@ -61,14 +142,148 @@ class ArgumentParser:
         self.use_color = False
         self.use_trim = False
         self.img_source = None
+        # Position of img_source in the argv given to parse_args
+        self.source_index = None
+        self._positions = []
         self.width = DEFAULT_WIDTH
+        self.palette = DEFAULT_PALETTE
+        self.color_bits = DEFAULT_COLOR_BITS
+        self.glyphs = DEFAULT_GLYPH_SET
+        self.shape = False
+        self.mode = DEFAULT_RENDER_MODE
+        self.dither = None
+        self.tone = DEFAULT_TONE
+        self.max_bytes = None
+        self.max_chars = None
+        self.variants = None
+        self.watch = False
+        self.frame_codec = DEFAULT_FRAME_CODEC
+        self.frame = None
+        self.use_batch = False
+        self.batch_sources = []
+        self.output_dir = DEFAULT_BATCH_OUTPUT_DIR
+        self.workers = None
+        self.chunk_size = DEFAULT_BATCH_CHUNK_SIZE
+        self.profile = None
+        self.use_animate = False
+        self.loop = False
+        self.output = None
+        self.exact = False
+        self.no_cache = False
+        self.clear_cache = False
+        self.cache_stats = False
+        self.serve = False
+        self.tiled = False
+        self.host = DEFAULT_SERVER_HOST
+        self.port = DEFAULT_SERVER_PORT
+        self.queue_size = DEFAULT_SERVER_QUEUE_SIZE
+    
+    def error(self, message):
+        """Report a usage error and exit"""
+        print(f"Error: {message}")
+        sys.exit(1)
+    
+    def show_help(self):
+        """Print the help text and exit"""
+        print_help()
+        sys.exit(0)
+    
+    def _pop_option(self, argv, names, default=None):
+        """Remove an option that takes a value (--name value or --name=value) from argv"""
+        value = default
+        i = 0
+        while i < len(argv):
+            arg = argv[i]
+            name, sep, inline_value = arg.partition('=')
+            if name in names:
+                if sep:
+                    value = inline_value
+                    del argv[i], self._positions[i]
+                elif i + 1 < len(argv):
+                    value = argv[i + 1]
+                    del argv[i:i + 2], self._positions[i:i + 2]
+                else:
+                    self.error(f"{name} requires a value")
+                continue
+            i += 1
+        return value
+    
+    def _pop_int_option(self, argv, names, default, minimum=None, maximum=None):
+        """Remove an integer option from argv, exiting with an error on bad values"""
+        value = self._pop_option(argv, names)
+        if value is None:
+            return default
+        try:
+            number = int(value)
+        except ValueError:
+            self.error(f"{names[0]} expects an integer, got '{value}'")
+        if minimum is not None and number < minimum:
+            self.error(f"{names[0]} must be at least {minimum}")
+        if maximum is not None and number > maximum:
+            self.error(f"{names[0]} must be at most {maximum}")
+        return number
+    
+    def _parse_profile(self, argv):
+        """Return 'table' for --profile, the format for --profile=FORMAT, or None"""
+        profile = None
+        for arg in argv:
+            if arg == '--profile':
+                profile = 'table'
+            elif arg.startswith('--profile='):
+                profile = arg.partition('=')[2]
+                if profile not in ('table', 'json'):
+                    self.error(f"Unknown profile format '{profile}'. Choose table or json")
+        return profile
+    
+    def _parse_variants(self, spec):
+        """Parse --variants, with --mode, --color and --trim as the defaults of each variant"""
+        if self.use_batch or self.use_animate or self.tiled or self.serve or self.max_bytes or self.max_chars:
+            self.error("--variants only applies to single still images")
+        try:
+            return parse_variants(spec, self.mode, self.use_color, self.use_trim)
+        except ValueError as e:
+            self.error(str(e))
     
     def parse_args(self, argv):
         """Parse command line arguments"""
         # Check for help
         if len(argv) < 2 or '--help' in argv or '-h' in argv:
-            print_help()
-            sys.exit(0)
+            self.show_help()
+        
+        # Options with values are removed first so their values are not
+        # mistaken for positional arguments
+        argv = list(argv)
+        self._positions = list(range(len(argv)))
+        self.palette = self._pop_option(argv, ('--palette',), DEFAULT_PALETTE)
+        if self.palette not in PALETTES:
+            self.error(f"Unknown palette '{self.palette}'. Choose from: {', '.join(PALETTES)}")
+        self.color_bits = self._pop_int_option(argv, ('--color-bits',), DEFAULT_COLOR_BITS, 1, 8)
+        self.glyphs = self._pop_option(argv, ('--glyphs',), DEFAULT_GLYPH_SET)
+        if self.glyphs not in GLYPH_SETS:
+            self.error(f"Unknown glyph set '{self.glyphs}'. Choose from: {', '.join(GLYPH_SETS)}")
+        self.dither = self._pop_option(argv, ('--dither',))
+        if self.dither is not None and self.dither not in DITHER_METHODS:
+            self.error(f"Unknown dither method '{self.dither}'. Choose from: {', '.join(DITHER_METHODS)}")
+        self.tone = self._pop_option(argv, ('--tone',), DEFAULT_TONE)
+        if self.tone not in TONE_PRESETS:
+            self.error(f"Unknown tone preset '{self.tone}'. Choose from: {', '.join(TONE_PRESETS)}")
+        self.mode = self._pop_option(argv, ('--mode',), DEFAULT_RENDER_MODE)
+        if self.mode not in RENDER_MODES:
+            self.error(f"Unknown mode '{self.mode}'. Choose from: {', '.join(RENDER_MODES)}")
+        self.max_bytes = self._pop_int_option(argv, ('--max-bytes',), None, 1)
+        self.max_chars = self._pop_int_option(argv, ('--max-chars',), None, 1)
+        variants_spec = self._pop_option(argv, ('--variants',))
+        self.output_dir = self._pop_option(argv, ('--output-dir',), DEFAULT_BATCH_OUTPUT_DIR)
+        self.workers = self._pop_int_option(argv, ('--workers',), None, 1)
+        self.chunk_size = self._pop_int_option(argv, ('--chunk-size',), DEFAULT_BATCH_CHUNK_SIZE, 1)
+        self.output = self._pop_option(argv, ('--output', '-o'))
+        self.frame_codec = self._pop_option(argv, ('--frame-codec',), DEFAULT_FRAME_CODEC)
+        if self.frame_codec not in FRAME_CODECS:
+            self.error(f"Unknown frame codec '{self.frame_codec}'. Choose from: {', '.join(FRAME_CODECS)}")
+        self.frame = self._pop_int_option(argv, ('--frame',), None, 0)
+        self.host = self._pop_option(argv, ('--host',), DEFAULT_SERVER_HOST)
+        self.port = self._pop_int_option(argv, ('--port',), DEFAULT_SERVER_PORT, 1, 65535)
+        self.queue_size = self._pop_int_option(argv, ('--queue-size',), DEFAULT_SERVER_QUEUE_SIZE, 1)
         
         # Parse flags
         self.use_web = '--web' in argv or '-w' in argv
@@ -76,11 +291,54 @@ class ArgumentParser:
         self.auto_copy = '--auto-copy' in argv or '-a' in argv
         self.use_color = '--color' in argv or '-c' in argv
         self.use_trim = '--trim' in argv or '-t' in argv
+        self.shape = '--shape' in argv
+        if self.mode != 'text' and (self.shape or self.glyphs != DEFAULT_GLYPH_SET):
+            self.error(f"--glyphs and --shape only apply to --mode text, not --mode {self.mode}")
+        if self.shape and self.dither:
+            self.error("--dither cannot be combined with --shape")
+        self.use_batch = '--batch' in argv or '-b' in argv
+        self.profile = self._parse_profile(argv)
+        self.use_animate = '--animate' in argv
+        self.loop = '--loop' in argv
+        self.exact = '--exact' in argv
+        self.tiled = '--tiled' in argv
+        self.no_cache = '--no-cache' in argv
+        self.clear_cache = '--clear-cache' in argv
+        self.cache_stats = '--cache-stats' in argv
+        self.serve = '--serve' in argv
+        self.watch = '--watch' in argv
+        if self.watch and (self.use_web or self.use_clipboard or self.use_batch or self.use_animate
+                           or self.tiled or self.serve or self.output or self.auto_copy
+                           or self.max_bytes or self.max_chars or variants_spec is not None):
+            self.error("--watch only applies to a single local image shown in the terminal")
+        if (self.max_bytes or self.max_chars) and (self.use_batch or self.use_animate or self.tiled):
+            self.error("--max-bytes and --max-chars only apply to single still images")
+        if variants_spec is not None:
+            self.variants = self._parse_variants(variants_spec)
+        if self.output and self.output.lower().endswith('.hraf') and (
+                self.variants or self.max_bytes or self.max_chars or self.tiled or self.auto_copy):
+            self.error(".hraf output cannot be combined with --variants, --max-bytes, --max-chars, "
+                       "--tiled or --auto-copy")
+        
+        # The server takes its images from requests
+        if self.serve:
+            return self
         
-        # Remove flags from argv to get positional arguments
-        filtered_argv = [arg for arg in argv if not arg.startswith('-')]
+        # Remove flags from argv to get positional arguments, with their original positions
+        positional = [(position, arg) for position, arg in zip(self._positions, argv)
+                      if not arg.startswith('-')]
+        filtered_argv = [arg for _, arg in positional]
         
-        if self.use_clipboard:
+        if self.use_batch:
+            # For batch mode, every positional is a source ('-' reads stdin)
+            # except a trailing number, which is the width
+            sources = [arg for arg in argv[1:] if arg == '-' or not arg.startswith('-')]
+            if sources and sources[-1].isdigit():
+                self.width = int(sources.pop())
+            if not sources:
+                self.error("Directory, glob pattern or '-' required when using --batch")
+            self.batch_sources = sources
+        elif self.use_clipboard:
             # For clipboard mode, no image source needed, just optional width
             self.img_source = None  # Will be handled by clipboard function
             try:
@@ -90,9 +348,9 @@ class ArgumentParser:
         elif self.use_web:
             # For web mode, expect URL as first argument after script name
             if len(filtered_argv) < 2:
-                print("Error: URL required when using -w/--web option")
-                sys.exit(1)
+                self.error("URL required when using -w/--web option")
             self.img_source = filtered_argv[1]
+            self.source_index = positional[1][0]
             try:
                 self.width = int(filtered_argv[2]) if len(filtered_argv) > 2 else DEFAULT_WIDTH
             except (IndexError, ValueError):
@@ -100,9 +358,11 @@ class ArgumentParser:
         else:
             # For file mode, expect filename as first argument
             if len(filtered_argv) < 2:
-                print("Error: Image file required")
-                sys.exit(1)
+                if self.clear_cache:
+                    return self
+                self.error("Image file required")
             self.img_source = filtered_argv[1]
+            self.source_index = positional[1][0]
             try:
                 self.width = int(filtered_argv[2]) if len(filtered_argv) > 2 else DEFAULT_WIDTH
             except (IndexError, ValueError):
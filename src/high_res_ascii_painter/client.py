@@ -0,0 +1,69 @@
+"""
+Thin client for the render server
+
+Takes the same arguments as the CLI but sends them to a running
+`ascii-painter --serve` instead of rendering locally, so each call costs
+only a small standard-library interpreter start. NumPy and PIL are never
+imported here.
+"""
+
+import base64
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+from .cli import ArgumentParser
+from .config import SERVER_REQUEST_TIMEOUT, SERVER_UNSUPPORTED_SOURCES
+
+
+def render_remote(argv, host, port, image_bytes=None, timeout=SERVER_REQUEST_TIMEOUT):
+    """
+    Ask the server at host:port to render argv (CLI arguments without the program name)
+    Returns the rendered text; raises urllib.error.HTTPError or URLError on failure.
+    """
+    payload = {'args': list(argv)}
+    if image_bytes is not None:
+        payload['image'] = base64.b64encode(image_bytes).decode('ascii')
+    request = urllib.request.Request(
+        f"http://{host}:{port}/render",
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read().decode('utf-8')
+
+
+def main():
+    """Entry point for ascii-painter-client"""
+    args = ArgumentParser().parse_args(sys.argv)
+    argv = sys.argv[1:]
+
+    if args.img_source and args.img_source.lower().endswith(SERVER_UNSUPPORTED_SOURCES):
+        print(f"Error: {os.path.splitext(args.img_source)[1]} sources are not supported by the server; "
+              f"run ascii-painter directly")
+        sys.exit(1)
+
+    # The server resolves paths from its own working directory
+    if args.img_source and not args.use_web and not os.path.isabs(args.img_source):
+        argv[args.source_index - 1] = os.path.abspath(args.img_source)
+
+    try:
+        text = render_remote(argv, args.host, args.port)
+    except urllib.error.HTTPError as e:
+        if e.code == 503:
+            print("Error: Render server is busy, try again shortly")
+        else:
+            print(e.read().decode('utf-8', 'replace').rstrip() or f"Error: Server returned {e.code}")
+        sys.exit(1)
+    except (urllib.error.URLError, OSError) as e:
+        reason = getattr(e, 'reason', e)
+        print(f"Error: Could not reach render server at {args.host}:{args.port}: {reason}")
+        print("Start one with: ascii-painter --serve")
+        sys.exit(1)
+
+    sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
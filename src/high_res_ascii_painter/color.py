@@ -0,0 +1,169 @@
+"""
+Bulk ANSI color emission for colored ASCII art
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from .config import PALETTES
+from .utils import get_ansi_color, get_ansi_color_256, get_ansi_color_16, reset_color
+
+# Standard xterm colors for the 16-color palette (SGR 30-37 and 90-97)
+XTERM_16_COLORS = [
+    (0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0),
+    (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+    (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0),
+    (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255),
+]
+
+# Precision of the nearest-color tables (bits kept per channel)
+TABLE_BITS = 5
+
+# Marks a code holding a foreground and a background color: the foreground
+# code sits in bits 32-62 and the background code in bits 0-31
+PAIR_FLAG = 1 << 63
+
+
+def xterm_256_colors():
+    """RGB values of xterm colors 16-255 (6x6x6 cube followed by the gray ramp)"""
+    levels = [0, 95, 135, 175, 215, 255]
+    cube = [(r, g, b) for r in levels for g in levels for b in levels]
+    grays = [(v, v, v) for v in range(8, 248, 10)]
+    return cube + grays
+
+
+@lru_cache(maxsize=None)
+def nearest_color_table(palette):
+    """
+    Map every quantized RGB value to the index of the nearest palette color
+
+    The table has 2**(3 * TABLE_BITS) entries and is indexed by
+    pack_rgb(arr, TABLE_BITS). The 256-color table skips colors 0-15 because
+    terminals theme them freely, so it returns xterm indices 16-255.
+    """
+    if palette == '256':
+        colors = np.array(xterm_256_colors(), dtype=np.float64)
+        offset = 16
+    elif palette == '16':
+        colors = np.array(XTERM_16_COLORS, dtype=np.float64)
+        offset = 0
+    else:
+        raise ValueError(f"No nearest-color table for palette '{palette}'")
+
+    levels = np.arange(1 << TABLE_BITS, dtype=np.float64)
+    centers = levels * (256 >> TABLE_BITS) + (128 >> TABLE_BITS)
+    r, g, b = np.meshgrid(centers, centers, centers, indexing='ij')
+    samples = np.stack([r.ravel(), g.ravel(), b.ravel()], axis=1)
+
+    # Squared distances via |a|^2 - 2ab + |b|^2, chunked to bound memory
+    table = np.empty(len(samples), dtype=np.uint8)
+    color_norms = (colors ** 2).sum(axis=1)
+    chunk = 4096
+    for start in range(0, len(samples), chunk):
+        block = samples[start:start + chunk]
+        dist = color_norms[None, :] - 2.0 * block @ colors.T
+        table[start:start + chunk] = dist.argmin(axis=1) + offset
+    return table
+
+
+def pack_rgb(arr_color, bits=8):
+    """Pack an (h, w, 3) uint8 array into one integer per cell, keeping the top bits"""
+    arr = arr_color.astype(np.uint32) >> (8 - bits)
+    return (arr[..., 0] << (2 * bits)) | (arr[..., 1] << bits) | arr[..., 2]
+
+
+def color_codes(arr_color, palette='truecolor', color_bits=8):
+    """
+    Reduce an RGB array to one color code per cell for the given palette
+
+    Truecolor codes are packed RGB (optionally quantized to color_bits per
+    channel), the other palettes return palette indices. An (h, w, 2, 3)
+    array gives each cell a foreground and a background color, which are
+    combined into one code with PAIR_FLAG set.
+    """
+    if arr_color.ndim == 4:
+        foreground = color_codes(arr_color[..., 0, :], palette, color_bits).astype(np.uint64)
+        background = color_codes(arr_color[..., 1, :], palette, color_bits).astype(np.uint64)
+        return np.uint64(PAIR_FLAG) | (foreground << np.uint64(32)) | background
+    if palette == 'truecolor':
+        return pack_rgb(arr_color, color_bits)
+    table = nearest_color_table(palette)
+    return table[pack_rgb(arr_color, TABLE_BITS)]
+
+
+def escape_for_code(code, palette='truecolor', color_bits=8, background=False):
+    """Return the escape sequence that selects a color code"""
+    if code & PAIR_FLAG:
+        return (escape_for_code((code >> 32) & 0x7fffffff, palette, color_bits)
+                + escape_for_code(code & 0xffffffff, palette, color_bits, background=True))
+    if palette == '256':
+        return get_ansi_color_256(code, background)
+    if palette == '16':
+        return get_ansi_color_16(code, background)
+    mask = (1 << color_bits) - 1
+    shift = 8 - color_bits
+    r = ((code >> (2 * color_bits)) & mask) << shift
+    g = ((code >> color_bits) & mask) << shift
+    b = (code & mask) << shift
+    return get_ansi_color(r, g, b, background)
+
+
+def render_color_lines(rows, arr_color, palette='truecolor', color_bits=8, row_lengths=None):
+    """
+    Colorize plain text rows using the matching (h, w, 3) RGB array, or
+    (h, w, 2, 3) foreground and background pairs
+
+    An escape is only emitted where a cell's color differs from its left
+    neighbor, and each line ends with a single reset. If row_lengths is
+    given, each row is cut to that many cells and empty rows stay empty.
+    """
+    if palette not in PALETTES:
+        raise ValueError(f"Unknown palette '{palette}'. Choose from: {', '.join(PALETTES)}")
+    if not rows:
+        return []
+    return render_code_lines(rows, color_codes(arr_color, palette, color_bits), palette, color_bits,
+                             row_lengths)
+
+
+def render_code_lines(rows, codes, palette='truecolor', color_bits=8, row_lengths=None):
+    """Colorize plain text rows using an (h, w) matrix of color codes from color_codes"""
+    if not rows:
+        return []
+    height, width = codes.shape
+    if width == 0:
+        return list(rows)
+
+    # Start of every run of identical colors, for the whole frame at once
+    run_starts = np.ones((height, width), dtype=bool)
+    run_starts[:, 1:] = codes[:, 1:] != codes[:, :-1]
+    start_rows, start_cols = np.nonzero(run_starts)
+    run_codes = codes[start_rows, start_cols].tolist()
+    row_bounds = np.searchsorted(start_rows, np.arange(height + 1)).tolist()
+    start_cols = start_cols.tolist()
+
+    lengths = [width] * height if row_lengths is None else row_lengths.tolist()
+
+    escapes = {}
+    reset = reset_color()
+    lines = []
+    for i, row in enumerate(rows):
+        length = lengths[i]
+        if length == 0:
+            lines.append('')
+            continue
+        parts = []
+        first, last = row_bounds[i], row_bounds[i + 1]
+        for run in range(first, last):
+            start = start_cols[run]
+            if start >= length:
+                break
+            code = run_codes[run]
+            escape = escapes.get(code)
+            if escape is None:
+                escape = escapes[code] = escape_for_code(code, palette, color_bits)
+            end = start_cols[run + 1] if run + 1 < last else width
+            parts.append(escape)
+            parts.append(row[start:min(end, length)])
+        parts.append(reset)
+        lines.append(''.join(parts))
+    return lines
@@ -2,11 +2,35 @@
 Configuration constants for ASCII art generator
 """
 
+import os
+
 # Slack-optimized density string
 # Carefully selected characters that render well in Slack's code blocks
 # Ordered from darkest to lightest, avoiding problematic Unicode characters
 DENSITY_STRING = '@#%*+=:-. '  # Simple ASCII characters that work consistently in Slack
 
+# Glyph sets selectable with --glyphs. Legacy sets keep their hand-ordered
+# ramp; the others are sorted by ink coverage measured with a monospace font
+GLYPH_SETS = {
+    'slack': DENSITY_STRING,
+    'ascii': ''.join(chr(code) for code in range(32, 127)),  # Every printable ASCII character
+    'blocks': ' ░▒▓█',  # Unicode shade blocks
+    'eighths': ' ▁▂▃▄▅▆▇█',  # Unicode lower eighth blocks
+}
+LEGACY_GLYPH_SETS = ('slack',)
+DEFAULT_GLYPH_SET = 'slack'
+GLYPH_COVERAGE_STEP = 0.005  # Glyphs whose coverage differs by less than this are duplicates
+
+# Render modes selectable with --mode. 'text' draws one glyph per brightness
+# sample; the others pack several thresholded sub-pixels into each cell
+RENDER_MODES = ('text', 'half', 'quadrant', 'braille')
+DEFAULT_RENDER_MODE = 'text'
+SUBCELL_INK_THRESHOLD = 0.5  # Sub-pixels asking for at least this much ink are drawn
+
+# Dithering settings (--dither)
+DITHER_METHODS = ('bayer', 'floyd-steinberg', 'atkinson')
+BAYER_ORDER = 3  # Ordered dithering uses a 2**order square threshold matrix (8x8)
+
 # Image enhancement settings
 CONTRAST_FACTOR = 2.0  # Higher contrast for better definition in Slack (0.5 to 2.0, where 1.0 is normal)
 BRIGHTNESS_OFFSET = 10  # Slightly brighter for better visibility (-50 to 50)
@@ -15,10 +39,96 @@ BRIGHTNESS_OFFSET = 10  # Slightly brighter for better visibility (-50 to 50)
 ASPECT_RATIO_CORRECTION = 0.5  # Adjusted for Slack's monospace font characteristics
 GAMMA_CORRECTION = 0.6  # Stronger correction for better contrast with limited characters
 
+# Tone presets selectable with --tone. Each image gets one 256-entry curve:
+# optional auto-levels (stretching the given low and high percentiles to
+# black and white) or histogram equalization, then contrast around the image
+# mean. Brightness and gamma are folded into the glyph tables.
+TONE_PRESETS = {
+    'slack': {'contrast': CONTRAST_FACTOR, 'brightness': BRIGHTNESS_OFFSET, 'gamma': GAMMA_CORRECTION,
+              'levels': None, 'equalize': False},
+    'natural': {'contrast': 1.0, 'brightness': 0, 'gamma': 1.0, 'levels': None, 'equalize': False},
+    'auto': {'contrast': 1.3, 'brightness': 0, 'gamma': 0.8, 'levels': (1.0, 99.0), 'equalize': False},
+    'equalize': {'contrast': 1.0, 'brightness': 0, 'gamma': 1.0, 'levels': None, 'equalize': True},
+}
+DEFAULT_TONE = 'slack'
+
+# Shape matching settings (--shape)
+SHAPE_CELL_COLS = 4  # Sub-pixels sampled across each cell
+SHAPE_CELL_ROWS = 8  # Sub-pixels sampled down each cell
+SHAPE_CHUNK_BYTES = 16 * 1024 * 1024  # Working memory for one block of cells being matched
+
+# Decoding settings
+DRAFT_OVERSAMPLE = 4  # Reduced decodes keep at least this many source pixels per output column
+
+# Output settings
+STREAM_BLOCK_ROWS = 64  # Rows rendered to strings at a time when streaming output
+OUTPUT_CHUNK_BYTES = 64 * 1024  # Characters gathered before each write to the output
+
+# Output budget settings (--max-bytes / --max-chars)
+BUDGET_OVERSAMPLE = 2  # Working image keeps this many samples per sample of the widest candidate
+
+# Multi-variant settings (--variants)
+VARIANT_OVERSAMPLE = 2  # Each variant is resampled from a pyramid level with this many pixels per sample
+
+# Tiled conversion settings
+TILED_STRIP_BYTES = 32 * 1024 * 1024  # Source pixel bytes read per strip in --tiled mode
+TILED_SAMPLE_ROWS = 256  # Rows sampled up front to estimate the contrast mean
+
+# Color output settings
+PALETTES = ('truecolor', '256', '16')
+DEFAULT_PALETTE = 'truecolor'
+DEFAULT_COLOR_BITS = 8  # Bits kept per channel in truecolor mode; fewer bits merge similar colors into longer runs
+
 # Default values
 DEFAULT_WIDTH = 70
 DEFAULT_TIMEOUT = 15
 
+# Batch mode settings
+DEFAULT_BATCH_OUTPUT_DIR = 'ascii_output'
+DEFAULT_BATCH_CHUNK_SIZE = 4  # Images handed to a worker process at a time
+
+# Animation settings
+DEFAULT_FRAME_DURATION_MS = 100  # Used when a frame does not specify its own duration
+FRAME_SEPARATOR = '\f'  # Line written between frames when saving an animation to a file
+
+# Binary frame files (.hraf)
+FRAME_CODECS = ('none', 'zlib', 'lzma')  # Plane compression; 'none' lets readers map planes without copying
+DEFAULT_FRAME_CODEC = 'zlib'
+
+# Watch mode settings (--watch)
+WATCH_POLL_INTERVAL = 0.25  # Seconds between checks of the source file (and waits for a key press)
+WATCH_DEBOUNCE = 0.3  # A change is rendered once the file has been unchanged for this many seconds
+WATCH_WIDTH_STEP = 10  # Columns added or removed by the + and - keys
+
+# Delta terminal output settings
+DELTA_FULL_REFRESH_THRESHOLD = 0.5  # Redraw the whole frame when more than this fraction of cells changed
+DELTA_MERGE_GAP = 4  # Unchanged cells rewritten to join two changed runs instead of moving the cursor
+
+# Render cache settings
+CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'high-res-ascii-painter',
+    'renders',
+)
+CACHE_MAX_BYTES = 64 * 1024 * 1024  # Least recently used entries are evicted beyond this size
+
+GLYPH_CACHE_DIR = os.path.join(os.path.dirname(CACHE_DIR), 'glyphs')
+
+# Web download settings
+HTTP_POOL_SIZE = 10  # Connections kept open per host by the shared session
+HTTP_MAX_WORKERS = 8  # Concurrent downloads when fetching several URLs
+MAX_DOWNLOAD_BYTES = 50 * 1024 * 1024  # Downloads are aborted past this size
+HTTP_CACHE_DIR = os.path.join(os.path.dirname(CACHE_DIR), 'http')
+HTTP_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Render server settings
+DEFAULT_SERVER_HOST = '127.0.0.1'
+DEFAULT_SERVER_PORT = 8470
+DEFAULT_SERVER_WORKERS = 4  # Render threads kept warm by --serve
+DEFAULT_SERVER_QUEUE_SIZE = 16  # Requests waiting beyond this are rejected with 503
+SERVER_REQUEST_TIMEOUT = 60  # Seconds a request may wait for its render
+SERVER_UNSUPPORTED_SOURCES = ('.npy', '.hraf')  # Not images: arrays are only read by --tiled, .hraf holds rendered frames
+
 # Web request headers
 WEB_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
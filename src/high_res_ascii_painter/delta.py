@@ -0,0 +1,115 @@
+"""
+Delta-encoded terminal output for consecutive frames
+"""
+
+import numpy as np
+from .color import color_codes, escape_for_code
+from .config import DELTA_FULL_REFRESH_THRESHOLD, DELTA_MERGE_GAP
+from .utils import (
+    clear_line_end,
+    clear_screen_end,
+    cursor_home,
+    move_cursor,
+    reset_color,
+)
+
+
+def changed_segments(changed, merge_gap=DELTA_MERGE_GAP):
+    """
+    Find runs of changed cells in a 2D boolean matrix
+
+    Returns (rows, starts, ends) arrays in row-major order. Runs on the same
+    row separated by at most merge_gap unchanged cells are merged, because
+    rewriting a few cells is cheaper than another cursor move.
+    """
+    height, width = changed.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = changed
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    if rows.size < 2 or merge_gap <= 0:
+        return rows, starts, ends
+
+    joined = (rows[1:] == rows[:-1]) & (starts[1:] - ends[:-1] <= merge_gap)
+    first = np.concatenate(([True], ~joined))
+    last = np.concatenate((~joined, [True]))
+    return rows[first], starts[first], ends[last]
+
+
+class DeltaRenderer:
+    """
+    Keeps the previous frame's glyph and color matrices and turns each new
+    frame into the escape sequences that update only the changed cells.
+    """
+
+    def __init__(self, converter, full_refresh_threshold=DELTA_FULL_REFRESH_THRESHOLD,
+                 merge_gap=DELTA_MERGE_GAP):
+        self.converter = converter
+        self.full_refresh_threshold = full_refresh_threshold
+        self.merge_gap = merge_gap
+        self.prev_indices = None
+        self.prev_codes = None
+        self.full_refreshes = 0
+        self.delta_updates = 0
+
+    def reset(self):
+        """Forget the previous frame so the next render is a full refresh"""
+        self.prev_indices = None
+        self.prev_codes = None
+
+    def _codes(self, arr_color):
+        if arr_color is None:
+            return None
+        return color_codes(arr_color, self.converter.palette, self.converter.color_bits)
+
+    def render(self, indices, arr_color=None):
+        """Return the terminal output that turns the previous frame into this one"""
+        codes = self._codes(arr_color)
+        prev_indices, prev_codes = self.prev_indices, self.prev_codes
+        self.prev_indices, self.prev_codes = indices, codes
+
+        if prev_indices is None or prev_indices.shape != indices.shape:
+            return self._full_refresh(indices, arr_color)
+
+        changed = indices != prev_indices
+        if codes is not None:
+            changed |= codes != prev_codes
+        if changed.size and changed.mean() > self.full_refresh_threshold:
+            return self._full_refresh(indices, arr_color)
+
+        self.delta_updates += 1
+        rows, starts, ends = changed_segments(changed, self.merge_gap)
+        if rows.size == 0:
+            return ''
+
+        density = self.converter.density
+        palette = self.converter.palette
+        color_bits = self.converter.color_bits
+        parts = []
+        for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist()):
+            parts.append(move_cursor(row + 1, start + 1))
+            glyphs = indices[row, start:end].tolist()
+            if codes is None:
+                parts.append(''.join(density[k] for k in glyphs))
+                continue
+
+            # Emit a color escape at the start of the segment and wherever the color changes
+            segment_codes = codes[row, start:end]
+            breaks = np.flatnonzero(segment_codes[1:] != segment_codes[:-1]) + 1
+            bounds = [0] + breaks.tolist() + [end - start]
+            for run_start, run_end in zip(bounds[:-1], bounds[1:]):
+                parts.append(escape_for_code(int(segment_codes[run_start]), palette, color_bits))
+                parts.append(''.join(density[k] for k in glyphs[run_start:run_end]))
+        if codes is not None:
+            parts.append(reset_color())
+        # Leave the cursor below the frame, where a full refresh would leave it
+        parts.append(move_cursor(indices.shape[0] + 1, 1))
+        return ''.join(parts)
+
+    def _full_refresh(self, indices, arr_color):
+        """Redraw every line from the cursor home position"""
+        self.full_refreshes += 1
+        lines = self.converter.render_lines(indices, arr_color)
+        line_end = clear_line_end() + '\n'
+        return cursor_home() + line_end.join(lines) + line_end + clear_screen_end()
@@ -0,0 +1,218 @@
+"""
+Pooled, cached and concurrent HTTP fetching for web images
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from .config import (
+    WEB_HEADERS,
+    DEFAULT_TIMEOUT,
+    HTTP_POOL_SIZE,
+    HTTP_MAX_WORKERS,
+    HTTP_CACHE_DIR,
+    HTTP_CACHE_MAX_BYTES,
+    MAX_DOWNLOAD_BYTES,
+)
+
+CHUNK_SIZE = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class DownloadTooLargeError(ValueError):
+    """Raised when a response exceeds the maximum download size"""
+
+
+def get_session():
+    """Return the shared requests.Session, creating it on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(WEB_HEADERS)
+            _session = session
+        return _session
+
+
+class HTTPCache:
+    """
+    On-disk cache of downloaded responses, revalidated with conditional GETs
+
+    Only responses carrying an ETag or Last-Modified header are stored. Each
+    entry is a body file plus a small JSON file with the validators and the
+    content type. Least recently used entries are evicted past max_bytes.
+    """
+
+    def __init__(self, directory=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + '.json', base + '.body'
+
+    def lookup(self, url):
+        """Return the stored metadata for url, or None"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(body_path) or meta.get('url') != url:
+            return None
+        return meta
+
+    def conditional_headers(self, meta):
+        """Build If-None-Match / If-Modified-Since headers from stored metadata"""
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def read_body(self, url):
+        """Return the stored body for url and mark it as recently used"""
+        _, body_path = self._paths(url)
+        with open(body_path, 'rb') as f:
+            body = f.read()
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+        return body
+
+    def store(self, url, response_headers, body):
+        """Store a response body if it carries validators"""
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': response_headers.get('Content-Type', ''),
+        }
+        meta_path, body_path = self._paths(url)
+        with self._lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                self._write_atomic(body_path, body)
+                self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+                self._evict()
+            except OSError:
+                pass  # Caching is best effort; the download itself succeeded
+
+    def _write_atomic(self, path, data):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.body'):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for stale in (path, path[:-len('.body')] + '.json'):
+                try:
+                    os.unlink(stale)
+                except OSError:
+                    pass
+            total -= size
+
+
+def fetch_url(url, session=None, cache=None, max_bytes=MAX_DOWNLOAD_BYTES, timeout=DEFAULT_TIMEOUT):
+    """
+    Download url and return (body_bytes, content_type)
+
+    The body is streamed and the download is aborted with
+    DownloadTooLargeError once it passes max_bytes. With a cache, stored
+    validators are sent and a 304 response is served from disk, or
+    downloaded again if the stored body has been evicted meanwhile.
+    """
+    session = session or get_session()
+    meta = cache.lookup(url) if cache is not None else None
+    headers = cache.conditional_headers(meta) if meta else {}
+
+    response = session.get(url, headers=headers, timeout=timeout, allow_redirects=True, stream=True)
+    if meta and response.status_code == 304:
+        response.close()
+        try:
+            return cache.read_body(url), meta.get('content_type', '')
+        except OSError:
+            # Evicted by another download since the lookup; fetch it again without validators
+            response = session.get(url, timeout=timeout, allow_redirects=True, stream=True)
+
+    with response:
+        response.raise_for_status()
+
+        content_length = response.headers.get('Content-Length')
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            raise DownloadTooLargeError(
+                f"Image is {int(content_length)} bytes, larger than the {max_bytes} byte limit")
+
+        chunks = []
+        received = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            received += len(chunk)
+            if received > max_bytes:
+                raise DownloadTooLargeError(f"Download exceeded the {max_bytes} byte limit")
+            chunks.append(chunk)
+        body = b''.join(chunks)
+
+        if cache is not None:
+            cache.store(url, response.headers, body)
+        return body, response.headers.get('Content-Type', '')
+
+
+def fetch_many(urls, max_workers=HTTP_MAX_WORKERS, cache=None, max_bytes=MAX_DOWNLOAD_BYTES,
+               timeout=DEFAULT_TIMEOUT):
+    """
+    Download several URLs concurrently over the shared connection pool
+
+    Returns a list of (url, body_bytes, content_type, error) in input order;
+    body_bytes is None and error holds the exception when a download failed.
+    """
+    session = get_session()
+
+    def fetch(url):
+        try:
+            body, content_type = fetch_url(url, session, cache, max_bytes, timeout)
+            return url, body, content_type, None
+        except (requests.exceptions.RequestException, ValueError, OSError) as e:
+            return url, None, '', e
+
+    if not urls:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        return list(executor.map(fetch, urls))
@@ -0,0 +1,249 @@
+"""
+Compact binary storage for rendered frames (.hraf)
+
+Rendered art is stored as the glyph-index matrix instead of text with
+inline escapes: one uint8 plane of ramp indices per frame, plus an optional
+color plane (RGB for truecolor, xterm palette indices for the 256 and 16
+color palettes) and the trimmed row lengths. Planes are compressed with
+zlib or lzma, or stored raw so a memory-mapped file can be read with
+np.frombuffer without copying.
+
+Layout (little-endian):
+
+    file header   magic 'HRAF', version, codec, palette, color bits,
+                  ramp length, then the ramp as UTF-8 (the ramp id: the
+                  glyph each index stands for)
+    frames        frame header (height, width, color kind, pair flag,
+                  row-length flag, duration, plane sizes), then the planes
+    index         one uint64 file offset per frame
+    trailer       index offset, frame count, magic 'HRAF'
+
+The trailer and index at the end make frames seekable: FrameReader maps
+the file and reads any frame without decoding the ones before it.
+"""
+
+import lzma
+import mmap
+import struct
+import zlib
+from collections import namedtuple
+
+import numpy as np
+from .ascii_converter import glyph_rows
+from .color import PAIR_FLAG, color_codes, render_code_lines
+from .config import FRAME_CODECS, DEFAULT_FRAME_CODEC, PALETTES
+
+MAGIC = b'HRAF'
+FORMAT_VERSION = 1
+
+# magic, version, codec, palette, color bits, ramp length in bytes
+FILE_HEADER = struct.Struct('<4sBBBBH')
+# height, width, color kind, pair flag, row-length flag, duration (ms),
+# glyph, color and row-length plane sizes in bytes
+FRAME_HEADER = struct.Struct('<IIBBBxIIII')
+# index offset, frame count, magic
+TRAILER = struct.Struct('<QI4s')
+
+# Color planes: none, (h, w, 3) RGB, or (h, w) palette indices; a pair flag
+# adds an axis of two colors (foreground and background) before the channels
+COLOR_NONE, COLOR_RGB, COLOR_PALETTE = 0, 1, 2
+
+Frame = namedtuple('Frame', 'indices colors row_lengths duration')
+
+
+def _compress(data, codec):
+    if codec == 'zlib':
+        return zlib.compress(data, 6)
+    if codec == 'lzma':
+        return lzma.compress(data)
+    return data
+
+
+def _decompress(data, codec):
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'lzma':
+        return lzma.decompress(data)
+    return data
+
+
+def encode_frame(indices, arr_color=None, row_lengths=None, duration=0, palette='truecolor',
+                 color_bits=8, codec=DEFAULT_FRAME_CODEC):
+    """
+    Encode one frame (a glyph-index matrix and its colors, as returned by
+    convert_to_cells) into the bytes of a frame record
+
+    Truecolor colors are stored as RGB with the bits color_bits drops
+    cleared, which changes nothing on screen and compresses better. Other
+    palettes store the palette index of each color.
+    """
+    height, width = indices.shape
+    planes = [np.ascontiguousarray(indices, dtype=np.uint8)]
+    kind, pairs = COLOR_NONE, 0
+    if arr_color is not None:
+        pairs = int(arr_color.ndim == 4)
+        if palette == 'truecolor':
+            kind = COLOR_RGB
+            mask = np.uint8((0xff << (8 - color_bits)) & 0xff)
+            planes.append(np.ascontiguousarray(arr_color & mask))
+        else:
+            kind = COLOR_PALETTE
+            if pairs:
+                planes.append(np.stack([color_codes(arr_color[..., i, :], palette).astype(np.uint8)
+                                        for i in range(2)], axis=-1))
+            else:
+                planes.append(color_codes(arr_color, palette).astype(np.uint8))
+    else:
+        planes.append(np.zeros(0, dtype=np.uint8))
+    planes.append(np.zeros(0, dtype=np.uint8) if row_lengths is None
+                  else np.asarray(row_lengths, dtype='<u4'))
+
+    payloads = [_compress(plane.tobytes(), codec) for plane in planes]
+    header = FRAME_HEADER.pack(height, width, kind, pairs, int(row_lengths is not None), int(duration),
+                               *(len(payload) for payload in payloads))
+    return header + b''.join(payloads)
+
+
+def decode_frame(buffer, offset=0, codec=DEFAULT_FRAME_CODEC):
+    """
+    Decode the frame record at offset in buffer (bytes, memoryview or mmap)
+
+    Uncompressed planes are views of buffer, not copies.
+    """
+    height, width, kind, pairs, has_lengths, duration, *sizes = FRAME_HEADER.unpack_from(buffer, offset)
+    offset += FRAME_HEADER.size
+    planes = []
+    for size in sizes:
+        data = memoryview(buffer)[offset:offset + size]
+        planes.append(data if codec == 'none' else _decompress(data, codec))
+        offset += size
+
+    indices = np.frombuffer(planes[0], dtype=np.uint8).reshape(height, width)
+    colors = None
+    if kind != COLOR_NONE:
+        shape = (height, width) + ((2,) if pairs else ()) + ((3,) if kind == COLOR_RGB else ())
+        colors = np.frombuffer(planes[1], dtype=np.uint8).reshape(shape)
+    row_lengths = np.frombuffer(planes[2], dtype='<u4').astype(np.intp) if has_lengths else None
+    return Frame(indices, colors, row_lengths, duration)
+
+
+class FrameWriter:
+    """
+    Writes frames rendered with one ramp and palette to a .hraf file
+
+    Frames are appended as they are written; the index is written on close,
+    so use it as a context manager.
+    """
+
+    def __init__(self, path, density, palette='truecolor', color_bits=8, codec=DEFAULT_FRAME_CODEC):
+        if codec not in FRAME_CODECS:
+            raise ValueError(f"Unknown frame codec '{codec}'. Choose from: {', '.join(FRAME_CODECS)}")
+        self.palette = palette
+        self.color_bits = color_bits
+        self.codec = codec
+        self.offsets = []
+        ramp = density.encode('utf-8')
+        self.file = open(path, 'wb')
+        self.file.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION, FRAME_CODECS.index(codec),
+                                         PALETTES.index(palette), color_bits, len(ramp)))
+        self.file.write(ramp)
+
+    @classmethod
+    def for_converter(cls, path, converter, codec=DEFAULT_FRAME_CODEC):
+        """Open a writer for frames produced by converter"""
+        return cls(path, converter.density, converter.palette, converter.color_bits, codec)
+
+    def write(self, indices, arr_color=None, row_lengths=None, duration=0):
+        """Append one frame"""
+        self.offsets.append(self.file.tell())
+        self.file.write(encode_frame(indices, arr_color, row_lengths, duration, self.palette,
+                                     self.color_bits, self.codec))
+
+    def close(self):
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.offsets, dtype='<u8').tobytes())
+        self.file.write(TRAILER.pack(index_offset, len(self.offsets), MAGIC))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FrameReader:
+    """
+    Random access to the frames of a .hraf file through a memory map
+
+    reader[i] decodes only frame i; reader.render(i) returns its output
+    lines, with colors when the file holds a color plane.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, codec, palette, self.color_bits, ramp_size = FILE_HEADER.unpack_from(self.map)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a version {FORMAT_VERSION} .hraf file")
+            index_offset, count, end_magic = TRAILER.unpack_from(self.map, len(self.map) - TRAILER.size)
+            if end_magic != MAGIC:
+                raise ValueError(f"{path} is incomplete (no frame index)")
+        except (struct.error, ValueError):
+            self.map.close()
+            raise ValueError(f"{path} is not a complete .hraf file") from None
+        self.codec = FRAME_CODECS[codec]
+        self.palette = PALETTES[palette]
+        start = FILE_HEADER.size
+        self.density = bytes(self.map[start:start + ramp_size]).decode('utf-8')
+        self.codepoints = np.array([ord(c) for c in self.density], dtype=np.uint32)
+        self.offsets = np.frombuffer(self.map, dtype='<u8', count=count, offset=index_offset)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        return decode_frame(self.map, int(self.offsets[index]), self.codec)
+
+    def render(self, index):
+        """Return the output lines of frame index"""
+        return render_frame(self[index], self.codepoints, self.palette, self.color_bits)
+
+    def close(self):
+        # Frames decoded without compression are views of the map
+        self.offsets = None
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def render_frame(frame, codepoints, palette='truecolor', color_bits=8):
+    """Build output lines from a decoded frame, like ASCIIConverter.render_lines"""
+    indices, colors, row_lengths = frame.indices, frame.colors, frame.row_lengths
+    height, width = indices.shape
+    if height == 0 or width == 0:
+        return [''] * height
+    rows = glyph_rows(codepoints, indices)
+    if colors is None:
+        if row_lengths is not None:
+            rows = [row[:length] for row, length in zip(rows, row_lengths.tolist())]
+        return rows
+
+    if palette == 'truecolor':
+        codes = color_codes(colors, palette, color_bits)
+    elif colors.ndim == 3:
+        codes = (np.uint64(PAIR_FLAG) | (colors[..., 0].astype(np.uint64) << np.uint64(32))
+                 | colors[..., 1].astype(np.uint64))
+    else:
+        codes = colors
+    return render_code_lines(rows, codes, palette, color_bits, row_lengths)
@@ -0,0 +1,290 @@
+"""
+Glyph sets: density ramps built from measured font coverage
+
+A glyph set is a character set. Each character is drawn with a monospace
+font and the fraction of its cell covered by ink is measured; the glyphs are
+then sorted from darkest to lightest, near-duplicates are dropped, and a
+256-entry table mapping a gray value to a ramp index is built. The ramp and
+table are cached on disk, keyed by font and character set, so converters
+only pay for a file read and convert with the same single table lookup.
+For shape matching, glyph_templates renders the same glyphs as small bitmaps.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+from .config import (
+    BRIGHTNESS_OFFSET,
+    GAMMA_CORRECTION,
+    GLYPH_SETS,
+    LEGACY_GLYPH_SETS,
+    GLYPH_CACHE_DIR,
+    GLYPH_COVERAGE_STEP
+)
+
+# Bump when a change to coverage measurement or table building makes old entries stale
+GLYPH_CACHE_VERSION = 1
+
+# Unicode block elements are drawn from their shape, so they can be used with
+# fonts that do not include them (like PIL's bundled font). Each is a list of
+# (x0, y0, x1, y1, ink) rectangles in a unit cell, with y growing downward.
+BLOCK_ELEMENT_SHAPES = {
+    '█': ((0, 0, 1, 1, 1.0),),  # full block
+    '▓': ((0, 0, 1, 1, 0.75),),  # dark shade
+    '▒': ((0, 0, 1, 1, 0.5),),  # medium shade
+    '░': ((0, 0, 1, 1, 0.25),),  # light shade
+    '▀': ((0, 0, 1, 0.5, 1.0),), '▄': ((0, 0.5, 1, 1, 1.0),),  # upper and lower halves
+    '▌': ((0, 0, 0.5, 1, 1.0),), '▐': ((0.5, 0, 1, 1, 1.0),),  # left and right halves
+    '▁': ((0, 7 / 8, 1, 1, 1.0),), '▂': ((0, 6 / 8, 1, 1, 1.0),), '▃': ((0, 5 / 8, 1, 1, 1.0),),
+    '▅': ((0, 3 / 8, 1, 1, 1.0),), '▆': ((0, 2 / 8, 1, 1, 1.0),), '▇': ((0, 1 / 8, 1, 1, 1.0),),
+    '▘': ((0, 0, 0.5, 0.5, 1.0),), '▝': ((0.5, 0, 1, 0.5, 1.0),),  # single quadrants
+    '▖': ((0, 0.5, 0.5, 1, 1.0),), '▗': ((0.5, 0.5, 1, 1, 1.0),),
+    '▚': ((0, 0, 0.5, 0.5, 1.0), (0.5, 0.5, 1, 1, 1.0)),  # diagonal quadrant pairs
+    '▞': ((0.5, 0, 1, 0.5, 1.0), (0, 0.5, 0.5, 1, 1.0)),
+    '▙': ((0, 0, 0.5, 1, 1.0), (0.5, 0.5, 1, 1, 1.0)),  # three quadrants
+    '▛': ((0, 0, 1, 0.5, 1.0), (0, 0.5, 0.5, 1, 1.0)),
+    '▜': ((0, 0, 1, 0.5, 1.0), (0.5, 0.5, 1, 1, 1.0)),
+    '▟': ((0.5, 0, 1, 0.5, 1.0), (0, 0.5, 1, 1, 1.0)),
+}
+
+BLOCK_ELEMENT_COVERAGE = {
+    char: sum((x1 - x0) * (y1 - y0) * ink for x0, y0, x1, y1, ink in rects)
+    for char, rects in BLOCK_ELEMENT_SHAPES.items()
+}
+
+
+def glyph_ink_table(brightness=BRIGHTNESS_OFFSET, gamma=GAMMA_CORRECTION):
+    """
+    Return the 256-entry float table of gamma-corrected brightness (0.0 to 1.0)
+    that ramp tables quantize
+
+    The brightness offset wraps like the original uint8 arithmetic did,
+    which keeps the output byte-identical.
+    """
+    values = (np.arange(256, dtype=np.uint8) + np.uint8(brightness % 256)).astype(np.float64)
+    return np.power(values / 255.0, gamma)
+
+
+def build_glyph_lut(n, brightness=BRIGHTNESS_OFFSET, gamma=GAMMA_CORRECTION):
+    """
+    Build a 256-entry table mapping a gray value to a density string index
+
+    Folds the brightness offset and gamma into a single lookup so the
+    per-pixel work is one array take.
+    """
+    gamma_corrected = glyph_ink_table(brightness, gamma)
+    # Map to density index with better precision
+    k = (gamma_corrected * (n - 1)).astype(np.intp)
+    k = np.minimum(k, n - 1)  # Ensure we don't exceed bounds
+    return (n - 1 - k).astype(np.uint8)
+
+
+def load_font(font_path=None, size=None):
+    """Load a TrueType font, or PIL's bundled monospace bitmap font when no path is given"""
+    from PIL import ImageFont
+
+    if font_path is None:
+        # Pillow before 10.1 has no load_default_imagefont; its load_default is the same bitmap font
+        if hasattr(ImageFont, 'load_default_imagefont'):
+            return ImageFont.load_default_imagefont()
+        return ImageFont.load_default()
+    return ImageFont.truetype(font_path, size or 16)
+
+
+def font_id(font_path=None, size=None):
+    """Identify a font for cache keys; files are keyed by path, size and modification time"""
+    if font_path is None:
+        return 'pil-default-bitmap'
+    return f"{os.path.abspath(font_path)}:{size or 16}:{os.stat(font_path).st_mtime_ns}"
+
+
+def _glyph_cell(chars, font):
+    """
+    Return a blank image the size of the union of the glyphs' bounding boxes
+    and the offset to draw each glyph at, so glyphs compare the way they look
+    side by side in a monospace terminal
+    """
+    from PIL import Image
+
+    left, top, right, bottom = 0, 0, 1, 1
+    for char in chars:
+        try:
+            box = font.getbbox(char)
+        except UnicodeEncodeError:
+            raise ValueError(f"Font has no glyph for {char!r}")
+        left, top = min(left, box[0]), min(top, box[1])
+        right, bottom = max(right, box[2]), max(bottom, box[3])
+    return Image.new('L', (right - left, bottom - top)), (-left, -top)
+
+
+def glyph_coverage(chars, font):
+    """Return the fraction of a character cell covered by each glyph (0.0 to 1.0)"""
+    from PIL import ImageDraw
+
+    cell, origin = _glyph_cell([char for char in chars if char not in BLOCK_ELEMENT_COVERAGE], font)
+    draw = ImageDraw.Draw(cell)
+    coverage = []
+    for char in chars:
+        if char in BLOCK_ELEMENT_COVERAGE:
+            coverage.append(BLOCK_ELEMENT_COVERAGE[char])
+            continue
+        draw.rectangle((0, 0, cell.size[0], cell.size[1]), fill=0)
+        draw.text(origin, char, fill=255, font=font)
+        coverage.append(float(np.asarray(cell).mean()) / 255.0)
+    return coverage
+
+
+def _block_template(rects, cols, rows):
+    """Rasterize block element rectangles to a rows x cols grid of ink fractions"""
+    x_edges = np.arange(cols + 1) / cols
+    y_edges = np.arange(rows + 1) / rows
+    template = np.zeros((rows, cols))
+    for x0, y0, x1, y1, ink in rects:
+        # Fraction of each sub-cell's width and height inside the rectangle
+        overlap_x = np.clip(np.minimum(x1, x_edges[1:]) - np.maximum(x0, x_edges[:-1]), 0, None) * cols
+        overlap_y = np.clip(np.minimum(y1, y_edges[1:]) - np.maximum(y0, y_edges[:-1]), 0, None) * rows
+        template += ink * np.outer(overlap_y, overlap_x)
+    return template
+
+
+def glyph_templates(chars, cols, rows, font=None):
+    """
+    Return a (len(chars), rows * cols) float32 array of each glyph's ink per sub-cell
+
+    Glyphs are drawn into a common cell and box-averaged down to a rows x cols
+    grid, in row-major order. Values are ink fractions (0.0 to 1.0), the
+    same units as the cell vectors they are matched against.
+    """
+    from PIL import Image, ImageDraw
+
+    if font is None:
+        font = load_font()
+    cell, origin = _glyph_cell([char for char in chars if char not in BLOCK_ELEMENT_SHAPES], font)
+    draw = ImageDraw.Draw(cell)
+    templates = np.empty((len(chars), rows * cols), dtype=np.float32)
+    for i, char in enumerate(chars):
+        if char in BLOCK_ELEMENT_SHAPES:
+            templates[i] = _block_template(BLOCK_ELEMENT_SHAPES[char], cols, rows).ravel()
+            continue
+        draw.rectangle((0, 0, cell.size[0], cell.size[1]), fill=0)
+        draw.text(origin, char, fill=255, font=font)
+        small = cell.resize((cols, rows), Image.Resampling.BOX)
+        templates[i] = np.asarray(small, dtype=np.float32).ravel() / 255.0
+    return templates
+
+
+def build_ramp(chars, coverage, step=GLYPH_COVERAGE_STEP):
+    """
+    Sort glyphs from darkest to lightest and drop near-duplicates
+
+    Glyphs whose coverage rounds to the same multiple of step are
+    interchangeable; the one listed first in chars is kept. Returns
+    (ramp, ramp_coverage) with coverage rescaled to span 0.0 to 1.0.
+    """
+    seen_chars = set()
+    seen_buckets = set()
+    entries = []
+    for char, value in zip(chars, coverage):
+        bucket = round(value / step)
+        if char in seen_chars or bucket in seen_buckets:
+            continue
+        seen_chars.add(char)
+        seen_buckets.add(bucket)
+        entries.append((value, char))
+    if len(entries) < 2:
+        raise ValueError("A glyph set needs at least two glyphs of different coverage")
+    entries.sort(key=lambda entry: -entry[0])
+
+    values = np.array([value for value, _ in entries])
+    values = (values - values.min()) / (values.max() - values.min())
+    return ''.join(char for _, char in entries), values
+
+
+def build_coverage_lut(ramp_coverage, brightness=BRIGHTNESS_OFFSET, gamma=GAMMA_CORRECTION):
+    """
+    Map each gray value to the ramp glyph whose ink best matches its brightness
+
+    Like the fixed ramp, brighter cells get more ink, and brightness and
+    gamma are folded in exactly the same way, so only the glyph choice
+    changes.
+    """
+    ink = glyph_ink_table(brightness, gamma)
+    return np.abs(ink[:, None] - ramp_coverage[None, :]).argmin(axis=1).astype(np.uint8)
+
+
+def lut_levels(lut, n, brightness=BRIGHTNESS_OFFSET, gamma=GAMMA_CORRECTION):
+    """
+    Return (levels, indices): the average ink of the gray values a table maps
+    to each glyph, ascending, and the glyph index each level belongs to
+
+    Glyphs the table never selects, or that tie with another glyph's level,
+    are left out.
+    """
+    ink = glyph_ink_table(brightness, gamma)
+    counts = np.bincount(lut, minlength=n)
+    used = np.flatnonzero(counts)
+    means = np.bincount(lut, weights=ink, minlength=n)[used] / counts[used]
+    levels, first = np.unique(means, return_index=True)
+    return levels.astype(np.float32), used[first].astype(np.uint8)
+
+
+def _cache_path(chars, font_key, directory, brightness, gamma):
+    key = json.dumps({
+        'version': GLYPH_CACHE_VERSION,
+        'chars': chars,
+        'font': font_key,
+        'brightness': brightness,
+        'gamma': gamma,
+        'step': GLYPH_COVERAGE_STEP,
+    }, sort_keys=True)
+    return os.path.join(directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+
+def load_ramp(chars, font_path=None, font_size=None, directory=GLYPH_CACHE_DIR,
+              brightness=BRIGHTNESS_OFFSET, gamma=GAMMA_CORRECTION):
+    """
+    Return (ramp, lut) for a character set, measuring coverage on a cache miss
+
+    lut is a 256-entry uint8 array of indices into ramp.
+    """
+    path = _cache_path(chars, font_id(font_path, font_size), directory, brightness, gamma)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        return entry['ramp'], np.array(entry['lut'], dtype=np.uint8)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    coverage = glyph_coverage(chars, load_font(font_path, font_size))
+    ramp, ramp_coverage = build_ramp(chars, coverage)
+    lut = build_coverage_lut(ramp_coverage, brightness, gamma)
+
+    # Caching is best effort; the ramp is cheap enough to rebuild
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'ramp': ramp, 'lut': lut.tolist()}, f)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+    return ramp, lut
+
+
+def glyph_set(name, brightness=BRIGHTNESS_OFFSET, gamma=GAMMA_CORRECTION):
+    """
+    Return (ramp, lut) for a named glyph set, with the given brightness
+    offset and gamma folded into the table
+
+    Legacy sets keep their hand-ordered ramp and the original evenly
+    spaced table, so their output is unchanged. Other sets are measured.
+    """
+    if name not in GLYPH_SETS:
+        raise ValueError(f"Unknown glyph set '{name}'. Choose from: {', '.join(GLYPH_SETS)}")
+    if name in LEGACY_GLYPH_SETS:
+        ramp = GLYPH_SETS[name]
+        return ramp, build_glyph_lut(len(ramp), brightness, gamma)
+    return load_ramp(GLYPH_SETS[name], brightness=brightness, gamma=gamma)
@@ -1,16 +1,83 @@
 """
 Image loading functionality for ASCII art generator
+
+PIL and requests are imported inside the functions that use them, so reading
+raw bytes for a render cache lookup stays cheap.
 """
 
 import sys
-import requests
-from PIL import Image
 from io import BytesIO
-from .config import WEB_HEADERS, DEFAULT_TIMEOUT
+from .config import DRAFT_OVERSAMPLE
 
+# Modes Image.reduce can work on directly
+REDUCIBLE_MODES = ('L', 'LA', 'La', 'RGB', 'RGBA', 'RGBa', 'RGBX', 'CMYK', 'YCbCr', 'I', 'F')
 
-def download_image_from_url(url):
-    """Download image from URL and return PIL Image object"""
+
+def reduction_for_width(img, width):
+    """
+    Return how reduce_for_width shrinks an opened image for width, without
+    decoding it: None, ('draft', (width, height)) or ('reduce', factor).
+    Equal results decode to the same pixels.
+    """
+    target_width = width * DRAFT_OVERSAMPLE
+    orig_width, orig_height = img.size
+    if orig_width < target_width * 2:
+        return None
+    target_height = max(1, round(target_width * orig_height / orig_width))
+    
+    if img.format == 'JPEG':
+        return 'draft', (target_width, target_height)
+    
+    factor = orig_width // target_width
+    if factor >= 2 and img.mode in REDUCIBLE_MODES:
+        return 'reduce', factor
+    return None
+
+
+def reduce_for_width(img, width):
+    """
+    Cheaply shrink an image toward DRAFT_OVERSAMPLE times the target width
+
+    JPEGs are decoded at a reduced scale via Image.draft, which must happen
+    before the pixel data is loaded. Other formats are box-reduced by an
+    integer factor. The final LANCZOS resize then runs on an image only a
+    few times larger than the output.
+    """
+    reduction = reduction_for_width(img, width)
+    if reduction is None:
+        return img
+    kind, value = reduction
+    if kind == 'draft':
+        img.draft(img.mode, value)
+        return img
+    return img.reduce(value)
+
+
+def check_image_content_type(content_type):
+    """Raise ValueError unless a response Content-Type looks like an image"""
+    content_type = content_type.lower()
+    
+    # More flexible content type checking
+    if not (content_type.startswith('image/') or 
+            any(img_type in content_type for img_type in ['jpeg', 'jpg', 'png', 'gif', 'webp', 'bmp'])):
+        
+        # Special message for HTML responses (common with authentication-required URLs)
+        if 'text/html' in content_type:
+            raise ValueError(f"URL returned HTML instead of an image. This usually means:\n"
+                           f"  - The URL requires authentication (like Slack files)\n"
+                           f"  - The URL is not a direct link to an image\n"
+                           f"  - The server is blocking automated requests\n"
+                           f"Content-Type: {content_type}")
+        else:
+            raise ValueError(f"URL does not point to an image. Content-Type: {content_type}")
+
+
+def download_image_bytes(url):
+    """Download image from URL and return the raw image bytes"""
+    # requests is only needed for web images, so it is not imported up front
+    import requests
+    from .fetcher import HTTPCache, fetch_url
+    
     try:
         print(f"Downloading image from: {url}")
         
@@ -20,31 +87,13 @@ def download_image_from_url(url):
             print("Consider downloading the image manually and using a local file instead.")
             print("Alternative: Use a public image hosting service like imgur, picsum.photos, etc.")
         
-        response = requests.get(url, headers=WEB_HEADERS, timeout=DEFAULT_TIMEOUT, allow_redirects=True)
-        response.raise_for_status()
+        # Streamed through the shared session; unchanged images come from the HTTP cache
+        content, content_type = fetch_url(url, cache=HTTPCache())
         
         # Check if the content is an image
-        content_type = response.headers.get('content-type', '').lower()
-        
-        # More flexible content type checking
-        if not (content_type.startswith('image/') or 
-                any(img_type in content_type for img_type in ['jpeg', 'jpg', 'png', 'gif', 'webp', 'bmp'])):
-            
-            # Special message for HTML responses (common with authentication-required URLs)
-            if 'text/html' in content_type:
-                raise ValueError(f"URL returned HTML instead of an image. This usually means:\n"
-                               f"  - The URL requires authentication (like Slack files)\n"
-                               f"  - The URL is not a direct link to an image\n"
-                               f"  - The server is blocking automated requests\n"
-                               f"Content-Type: {content_type}")
-            else:
-                raise ValueError(f"URL does not point to an image. Content-Type: {content_type}")
+        check_image_content_type(content_type)
         
-        # Try to load image from bytes
-        image_bytes = BytesIO(response.content)
-        img = Image.open(image_bytes)
-        print(f"Successfully downloaded image: {img.size[0]}x{img.size[1]} pixels")
-        return img
+        return content
     
     except requests.exceptions.RequestException as e:
         print(f"Error downloading image: {e}")
@@ -62,10 +111,37 @@ def download_image_from_url(url):
         sys.exit(1)
 
 
-def load_image_from_file(file_path):
-    """Load image from local file and return PIL Image object"""
+def load_image_from_bytes(data, target_width=None):
+    """Decode raw image bytes and return PIL Image object, reduced for target_width if given"""
+    from PIL import Image
+    
+    try:
+        img = Image.open(BytesIO(data))
+        if target_width:
+            img = reduce_for_width(img, target_width)
+        return img
+    except Exception as e:
+        print(f"Error processing image: {e}")
+        sys.exit(1)
+
+
+def download_image_from_url(url, target_width=None):
+    """Download image from URL and return PIL Image object"""
+    img = load_image_from_bytes(download_image_bytes(url))
+    print(f"Successfully downloaded image: {img.size[0]}x{img.size[1]} pixels")
+    if target_width:
+        img = reduce_for_width(img, target_width)
+    return img
+
+
+def load_image_from_file(file_path, target_width=None):
+    """Load image from local file and return PIL Image object, reduced for target_width if given"""
+    from PIL import Image
+    
     try:
         img = Image.open(file_path)
+        if target_width:
+            img = reduce_for_width(img, target_width)
         return img
     except FileNotFoundError:
         print(f"Error: File '{file_path}' not found")
@@ -75,9 +151,27 @@ def load_image_from_file(file_path):
         sys.exit(1)
 
 
-def load_image(source, is_web=False):
-    """Load image from either web URL or local file"""
+def read_image_bytes(source, is_web=False):
+    """Read the raw bytes of an image from either web URL or local file"""
+    if is_web:
+        return download_image_bytes(source)
+    try:
+        with open(source, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        print(f"Error: File '{source}' not found")
+        sys.exit(1)
+    except OSError as e:
+        print(f"Error opening image file: {e}")
+        sys.exit(1)
+
+
+def load_image(source, is_web=False, target_width=None):
+    """
+    Load image from either web URL or local file
+    With target_width set, decoding is reduced to a few times that width
+    """
     if is_web:
-        return download_image_from_url(source)
+        return download_image_from_url(source, target_width)
     else:
-        return load_image_from_file(source)
+        return load_image_from_file(source, target_width)
@@ -8,10 +8,248 @@ Supports both local files and web URLs with various customization options.
 
 import sys
 import os
+from contextlib import nullcontext
 from .cli import ArgumentParser
-from .image_loader import load_image
-from .ascii_converter import ASCIIConverter
-from .utils import trim_ascii_art, save_clipboard_image, copy_to_clipboard, strip_ansi_codes
+from .cache import RenderCache, render_params
+from .image_loader import load_image, load_image_from_bytes, read_image_bytes, reduction_for_width
+from .profiling import profile_stages, stage
+from .config import DEFAULT_SERVER_WORKERS, FRAME_SEPARATOR
+from .utils import write_lines, save_clipboard_image, copy_to_clipboard, strip_ansi_codes
+
+# NumPy, PIL and requests are imported where they are first needed, so
+# --help, cache hits and local files skip what they don't use
+
+
+def make_converter(args):
+    """Create the converter for the requested render mode, with color support if requested"""
+    from .subcell import create_converter
+    return create_converter(mode=args.mode, use_color=args.use_color, palette=args.palette,
+                            color_bits=args.color_bits, glyphs=args.glyphs, shape=args.shape,
+                            dither=args.dither, tone=args.tone)
+
+
+def convert_cached(args, img_source, use_web):
+    """Convert an image through the render cache; returns (line iterator, cache or None)"""
+    # Reduced decoding needs the output width up front; --exact decodes everything
+    target_width = None if args.exact else args.width
+    
+    # Look the render up by content hash before decoding anything
+    cache = None if args.no_cache else RenderCache()
+    ascii_lines = None
+    if cache is not None:
+        with stage('read_source'):
+            source_bytes = read_image_bytes(img_source, use_web)
+        with stage('cache_lookup'):
+            params = render_params(args.width, args.use_trim, args.use_color, args.palette,
+                                   args.color_bits, args.glyphs, args.shape, args.mode, args.dither,
+                                   args.tone)
+            params['exact'] = args.exact
+            cache_key = cache.make_key(source_bytes, params)
+            ascii_lines = cache.get(cache_key)
+    
+    if ascii_lines is None:
+        converter = make_converter(args)
+        
+        # Load and decode the image (PIL decodes lazily, so force it inside this stage)
+        with stage('load_image'):
+            if cache is not None:
+                img = load_image_from_bytes(source_bytes, target_width)
+            else:
+                img = load_image(img_source, use_web, target_width)
+            img.load()
+    
+        # Convert image to ASCII art, trimming background on the glyph matrix if requested;
+        # lines are built as they are written out, and stored in the cache on the way
+        ascii_lines = converter.iter_ascii_lines(img, args.width, trim=args.use_trim)
+        if cache is not None:
+            ascii_lines = cache.put_iter(cache_key, ascii_lines)
+    
+    return ascii_lines, cache
+
+
+def fit_to_budget(args, img_source, use_web):
+    """Render at the widest width up to args.width whose output fits the size budget"""
+    from .budget import fit_width
+    converter = make_converter(args)
+    with stage('read_source'):
+        source_bytes = read_image_bytes(img_source, use_web)
+    with stage('load_image'):
+        img = load_image_from_bytes(source_bytes, None if args.exact else args.width)
+        img.load()
+
+    # Widths that reduce the source the same way share one decode
+    decodes = {reduction_for_width(load_image_from_bytes(source_bytes), args.width): img}
+
+    def render(width):
+        # Decode the way a plain run at this width would, so the reported width reproduces the output
+        source = img
+        if not args.exact:
+            reduction = reduction_for_width(load_image_from_bytes(source_bytes), width)
+            source = decodes.get(reduction)
+            if source is None:
+                source = decodes[reduction] = load_image_from_bytes(source_bytes, width)
+                source.load()
+        return converter.convert_to_ascii(source, width, trim=args.use_trim)
+
+    with stage('fit_width'):
+        try:
+            width, lines, size = fit_width(converter, img, args.width, max_bytes=args.max_bytes,
+                                           max_chars=args.max_chars, trim=args.use_trim, render=render)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    # Reported on stderr so the art itself can be piped or pasted as is
+    unit = 'bytes' if args.max_bytes is not None else 'characters'
+    print(f"Fitted width {width} ({size} {unit})", file=sys.stderr)
+    return lines
+
+
+def write_image_variants(args, img_source, use_web):
+    """Render every --variants entry from one decode into args.output_dir"""
+    from .variants import write_variants
+    widest = max(variant.width for variant in args.variants)
+    with stage('load_image'):
+        img = load_image(img_source, use_web, None if args.exact else widest)
+        img.load()
+    stem = os.path.splitext(os.path.basename(img_source.split('?')[0].rstrip('/')))[0] or 'image'
+    with stage('variants'):
+        manifest_path = write_variants(img, args.variants, args.output_dir, stem, source=img_source,
+                                       glyphs=args.glyphs, shape=args.shape, palette=args.palette,
+                                       color_bits=args.color_bits, dither=args.dither, tone=args.tone)
+    print(f"Wrote {len(args.variants)} variants to: {args.output_dir} (manifest: {manifest_path})")
+
+
+def write_frame_file(args, img_source, use_web):
+    """Convert an image (every frame with --animate) into a binary .hraf file"""
+    from .animation import write_frame_file as write_frames
+    converter = make_converter(args)
+    img = load_image(img_source, use_web, None if args.exact else args.width)
+    count = write_frames(img, converter, args.width, args.output, trim=args.use_trim,
+                         codec=args.frame_codec, animate=args.use_animate)
+    print(f"Wrote {count} frames to: {args.output}")
+
+
+def print_frame_file(args, img_source):
+    """Render the frames stored in a .hraf file back to text (only args.frame if given)"""
+    from .frames import FrameReader
+    try:
+        reader = FrameReader(img_source)
+    except (OSError, ValueError) as e:
+        print(f"Error opening frame file: {e}")
+        sys.exit(1)
+    with reader:
+        if args.frame is not None and args.frame >= len(reader):
+            print(f"Error: {img_source} has {len(reader)} frames, no frame {args.frame}")
+            sys.exit(1)
+        frames = [args.frame] if args.frame is not None else range(len(reader))
+        with open(args.output, 'w', encoding='utf-8') if args.output else nullcontext(sys.stdout) as f:
+            for i, index in enumerate(frames):
+                if i:
+                    f.write(FRAME_SEPARATOR + '\n')
+                write_lines(reader.render(index), f)
+    if args.output:
+        print(f"ASCII art saved to: {args.output}")
+
+
+def render_image(args, img_source, use_web):
+    """Convert a single image and output it as requested by the parsed arguments"""
+    # Watch mode keeps redrawing until the user quits; nothing is cached
+    if args.watch:
+        from .watch import watch
+        if not os.path.isfile(img_source):
+            print(f"Error: File '{img_source}' not found")
+            sys.exit(1)
+        renders = watch(img_source, make_converter(args), args.width, trim=args.use_trim, exact=args.exact)
+        print(f"Rendered {renders} times")
+        return
+    
+    # Stored frames are rendered back to text without decoding an image
+    if img_source.lower().endswith('.hraf') and not use_web:
+        print_frame_file(args, img_source)
+        return
+    
+    # Binary frame files store the glyph matrix instead of text and are never cached
+    if args.output and args.output.lower().endswith('.hraf'):
+        write_frame_file(args, img_source, use_web)
+        return
+    
+    # Animations are streamed frame by frame and never cached
+    if args.use_animate:
+        from .animation import is_animated, play_animation, write_animation
+        converter = make_converter(args)
+        img = load_image(img_source, use_web)
+        still = not is_animated(img)
+        if args.output:
+            count = write_animation(img, converter, args.width, args.output, trim=args.use_trim)
+            print(f"Wrote {count} frames to: {args.output}")
+        else:
+            # Looping a still image would only redraw the same frame until interrupted
+            shown, dropped = play_animation(img, converter, args.width, trim=args.use_trim,
+                                            loop=args.loop and not still)
+            print(f"Played {shown} frames ({dropped} dropped to keep up with the frame rate)")
+        # Reported last, since playback clears the screen
+        if still:
+            print(f"Warning: {img_source} is not animated; --animate rendered its only frame")
+        return
+    
+    # Variants share one decode and are written to files, never cached
+    if args.variants:
+        write_image_variants(args, img_source, use_web)
+        return
+    
+    # Budget renders try several widths from one working image and are never cached
+    if args.max_bytes or args.max_chars:
+        ascii_lines = fit_to_budget(args, img_source, use_web)
+        cache = None
+    # Very large images are read in strips and streamed; .npy arrays can only be read this way
+    elif args.tiled or img_source.lower().endswith('.npy'):
+        if use_web:
+            print("Error: --tiled needs a local file")
+            sys.exit(1)
+        if args.shape or args.dither or args.mode != 'text':
+            print("Error: --tiled only supports --mode text without --shape or --dither")
+            sys.exit(1)
+        from .tiled import iter_tiled_lines
+        try:
+            ascii_lines = iter_tiled_lines(img_source, make_converter(args), args.width,
+                                           trim=args.use_trim)
+        except (OSError, ValueError) as e:
+            print(f"Error opening image file: {e}")
+            sys.exit(1)
+        cache = None
+    else:
+        ascii_lines, cache = convert_cached(args, img_source, use_web)
+    
+    # Lines are streamed straight to the output; only the clipboard needs them all at once
+    if args.auto_copy:
+        ascii_lines = list(ascii_lines)
+    
+    # Output the final result
+    with stage('output'):
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                write_lines(ascii_lines, f)
+            print(f"ASCII art saved to: {args.output}")
+        else:
+            write_lines(ascii_lines, sys.stdout)
+    
+    # Copy to clipboard if requested
+    if args.auto_copy:
+        with stage('clipboard'):
+            ascii_text = '\n'.join(ascii_lines)
+            # Remove ANSI color codes for clipboard (plain text for better compatibility)
+            if args.use_color:
+                clipboard_text = strip_ansi_codes(ascii_text)
+                print("Note: Color codes removed for clipboard compatibility")
+            else:
+                clipboard_text = ascii_text
+            copy_to_clipboard(clipboard_text)
+    
+    if cache is not None:
+        totals = cache.save_stats()
+        if args.cache_stats:
+            result = 'hit' if cache.hits else 'miss'
+            print(f"Render cache: {result} (total hits: {totals['hits']}, misses: {totals['misses']})")
 
 
 def main():
@@ -20,6 +258,31 @@ def main():
     parser = ArgumentParser()
     args = parser.parse_args(sys.argv)
     
+    # Clear the render cache first; with no image given there is nothing else to do
+    if args.clear_cache:
+        RenderCache().clear()
+        print("Render cache cleared")
+        if args.img_source is None and not (args.use_clipboard or args.use_batch or args.serve):
+            sys.exit(0)
+    
+    # Handle server mode: keep running and render images sent by clients
+    if args.serve:
+        from .server import serve
+        serve(args.host, args.port, workers=args.workers or DEFAULT_SERVER_WORKERS,
+              queue_size=args.queue_size, use_cache=not args.no_cache)
+        return
+    
+    # Handle batch mode: many images, results written to an output directory
+    if args.use_batch:
+        from .batch import run_batch
+        failures = run_batch(args.batch_sources, args.output_dir, args.width,
+                             is_web=args.use_web, trim=args.use_trim, exact=args.exact,
+                             workers=args.workers, chunk_size=args.chunk_size,
+                             use_color=args.use_color, palette=args.palette,
+                             color_bits=args.color_bits, glyphs=args.glyphs, shape=args.shape,
+                             mode=args.mode, dither=args.dither, tone=args.tone)
+        sys.exit(1 if failures else 0)
+    
     # Handle clipboard mode
     if args.use_clipboard:
         try:
@@ -34,37 +297,18 @@ def main():
         img_source = args.img_source
         use_web = args.use_web
     
+    # Collect per-stage timings and memory if requested
+    profiling = profile_stages() if args.profile else nullcontext()
+    
     try:
-        # Load the image
-        img = load_image(img_source, use_web)
-        
-        # Create ASCII converter with color support if requested
-        converter = ASCIIConverter(use_color=args.use_color)
-        
-        # Convert image to ASCII art
-        ascii_lines = converter.convert_to_ascii(img, args.width)
-        
-        # Apply trimming if requested
-        if args.use_trim:
-            ascii_lines = trim_ascii_art(ascii_lines)
-        
-        # Convert to list to allow multiple uses
-        ascii_lines = list(ascii_lines)
+        with profiling as profiler:
+            render_image(args, img_source, use_web)
         
-        # Output the final result
-        for line in ascii_lines:
-            print(line)
-        
-        # Copy to clipboard if requested
-        if args.auto_copy:
-            ascii_text = '\n'.join(ascii_lines)
-            # Remove ANSI color codes for clipboard (plain text for better compatibility)
-            if args.use_color:
-                clipboard_text = strip_ansi_codes(ascii_text)
-                print("Note: Color codes removed for clipboard compatibility")
-            else:
-                clipboard_text = ascii_text
-            copy_to_clipboard(clipboard_text)
+        # Report on stderr so the art itself stays clean for pipes and files
+        if args.profile == 'json':
+            print(profiler.to_json(), file=sys.stderr)
+        elif args.profile:
+            print(profiler.summary_table(), file=sys.stderr)
             
     finally:
         # Clean up temporary file if we created one
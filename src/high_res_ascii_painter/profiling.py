@@ -0,0 +1,104 @@
+"""
+Per-stage timing and memory instrumentation for the conversion pipeline
+
+Library callers can collect the same metrics as --profile:
+
+    with profile_stages() as profiler:
+        lines = converter.convert_to_ascii(img, 70)
+    print(profiler.summary_table())
+"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+_active_profiler = ContextVar('active_profiler', default=None)
+_NO_STAGE = nullcontext()
+
+
+class StageProfiler:
+    """Records wall time and peak traced memory for each pipeline stage"""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = []
+        # Peak memory seen so far by each open stage, innermost last
+        self._open_peaks = []
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage and record how far traced memory rose above its start"""
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            start_current, parent_peak = tracemalloc.get_traced_memory()
+            if self._open_peaks:
+                self._open_peaks[-1] = max(self._open_peaks[-1], parent_peak)
+            tracemalloc.reset_peak()
+            self._open_peaks.append(start_current)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak_bytes = None
+            if tracing:
+                stage_peak = max(self._open_peaks.pop(), tracemalloc.get_traced_memory()[1])
+                peak_bytes = max(0, stage_peak - start_current)
+                # Nested stages reset the peak, so hand ours up to the enclosing stage
+                if self._open_peaks:
+                    self._open_peaks[-1] = max(self._open_peaks[-1], stage_peak)
+            self.stages.append({'stage': name, 'seconds': seconds, 'peak_bytes': peak_bytes})
+
+    def totals(self):
+        """Sum time and take the maximum peak per stage name, in first-seen order"""
+        totals = {}
+        for entry in self.stages:
+            total = totals.setdefault(entry['stage'], {'calls': 0, 'seconds': 0.0, 'peak_bytes': None})
+            total['calls'] += 1
+            total['seconds'] += entry['seconds']
+            if entry['peak_bytes'] is not None:
+                total['peak_bytes'] = max(total['peak_bytes'] or 0, entry['peak_bytes'])
+        return totals
+
+    def summary_table(self):
+        """Format the per-stage totals as a text table"""
+        lines = [f"{'stage':<16} {'calls':>5} {'time (ms)':>10} {'peak mem (KB)':>14}"]
+        for name, total in self.totals().items():
+            peak = '-' if total['peak_bytes'] is None else f"{total['peak_bytes'] / 1024:.1f}"
+            lines.append(f"{name:<16} {total['calls']:>5} {total['seconds'] * 1000:>10.2f} {peak:>14}")
+        return '\n'.join(lines)
+
+    def to_json(self):
+        """Serialize the per-stage totals as JSON"""
+        return json.dumps({'stages': self.totals()}, indent=2)
+
+
+@contextmanager
+def profile_stages(trace_memory=True):
+    """
+    Collect per-stage metrics for every pipeline stage run inside the block
+
+    Starts tracemalloc for the duration of the block if it is not already
+    running. Yields the StageProfiler holding the results.
+    """
+    profiler = StageProfiler(trace_memory)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    token = _active_profiler.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active_profiler.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def stage(name):
+    """Return a context manager recording a stage on the active profiler, if any"""
+    profiler = _active_profiler.get()
+    if profiler is None:
+        return _NO_STAGE
+    return profiler.stage(name)
@@ -0,0 +1,277 @@
+"""
+Long-running render server that keeps converters and caches warm
+
+Requests are POSTed to /render as JSON:
+
+    {"args": ["image.jpg", "60", "--trim"], "image": "<base64, optional>"}
+
+args takes the same options as the command line. When image is given, the
+bytes are rendered and args must not name a source. The rendered text is
+returned as the response body. Requests wait in a bounded queue for a
+worker thread; once the queue is full new requests are rejected with 503.
+"""
+
+import base64
+import binascii
+import json
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .cache import RenderCache
+from .cli import ArgumentParser
+from .config import (
+    DEFAULT_SERVER_QUEUE_SIZE,
+    DEFAULT_SERVER_WORKERS,
+    SERVER_REQUEST_TIMEOUT,
+    SERVER_UNSUPPORTED_SOURCES
+)
+from .image_loader import load_image_from_bytes, read_image_bytes
+from .subcell import create_converter
+
+# Stand-in source name used to parse args when the image bytes are uploaded
+UPLOAD_SOURCE = '<upload>'
+
+# Options that only make sense for an interactive CLI run
+UNSUPPORTED_OPTIONS = {
+    'use_batch': '--batch',
+    'use_clipboard': '--clip',
+    'use_animate': '--animate',
+    'auto_copy': '--auto-copy',
+    'output': '--output',
+    'profile': '--profile',
+    'serve': '--serve',
+    'max_bytes': '--max-bytes',
+    'max_chars': '--max-chars',
+    'variants': '--variants',
+    'tiled': '--tiled',
+    'watch': '--watch',
+    'loop': '--loop',
+    'frame': '--frame',
+    'clear_cache': '--clear-cache',
+    'cache_stats': '--cache-stats',
+}
+
+
+class RequestError(ValueError):
+    """Raised for a request that cannot be rendered as given"""
+
+
+class RequestParser(ArgumentParser):
+    """ArgumentParser that raises RequestError instead of printing and exiting"""
+
+    def error(self, message):
+        raise RequestError(message)
+
+    def show_help(self):
+        raise RequestError("--help is not available through the server")
+
+
+def parse_request(payload):
+    """Parse a request payload into (RequestParser, image_bytes or None)"""
+    if not isinstance(payload, dict):
+        raise RequestError("Request body must be a JSON object")
+    argv = payload.get('args', [])
+    if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+        raise RequestError("'args' must be a list of strings")
+
+    image_bytes = None
+    if payload.get('image') is not None:
+        try:
+            image_bytes = base64.b64decode(payload['image'], validate=True)
+        except (TypeError, binascii.Error):
+            raise RequestError("'image' must be base64 encoded")
+        argv = [UPLOAD_SOURCE] + argv
+
+    if not argv:
+        raise RequestError("No image given")
+
+    args = RequestParser().parse_args(['ascii-painter'] + argv)
+    for name, option in UNSUPPORTED_OPTIONS.items():
+        # --frame 0 is a value, so only None and False mean an option was not given
+        value = getattr(args, name)
+        if value is not None and value is not False:
+            raise RequestError(f"{option} is not supported by the server")
+    if args.img_source is None:
+        raise RequestError("No image given")
+    if args.img_source.lower().endswith(SERVER_UNSUPPORTED_SOURCES):
+        raise RequestError(f"{os.path.splitext(args.img_source)[1]} sources are not supported by the server")
+    return args, image_bytes
+
+
+class RenderService:
+    """
+    Bounded queue of render jobs served by a pool of worker threads
+
+    Converters are kept per option set and the render cache is shared, so
+    repeated requests skip both interpreter startup and conversion setup.
+    """
+
+    def __init__(self, workers=DEFAULT_SERVER_WORKERS, queue_size=DEFAULT_SERVER_QUEUE_SIZE,
+                 cache=None):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.cache = cache
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.rejected = 0
+        self.completed = 0
+        self._counters_lock = threading.Lock()
+        self._converters = {}
+        self._converters_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"render-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, args, image_bytes=None):
+        """
+        Queue a render and return a Future for its text
+        Raises queue.Full when the queue is at capacity.
+        """
+        future = Future()
+        try:
+            self.jobs.put_nowait((future, args, image_bytes))
+        except queue.Full:
+            with self._counters_lock:
+                self.rejected += 1
+            raise
+        return future
+
+    def get_converter(self, args):
+        """Return the converter for the parsed options, creating it on first use"""
+        key = (args.mode, args.use_color, args.palette, args.color_bits, args.glyphs, args.shape,
+               args.dither, args.tone)
+        with self._converters_lock:
+            converter = self._converters.get(key)
+            if converter is None:
+                converter = self._converters[key] = create_converter(
+                    mode=args.mode, use_color=args.use_color, palette=args.palette,
+                    color_bits=args.color_bits, glyphs=args.glyphs, shape=args.shape,
+                    dither=args.dither, tone=args.tone)
+            return converter
+
+    def render(self, args, image_bytes=None):
+        """Render one request and return the text"""
+        converter = self.get_converter(args)
+        if image_bytes is None:
+            image_bytes = read_image_bytes(args.img_source, args.use_web)
+
+        cache = None if args.no_cache else self.cache
+        if cache is not None:
+            params = converter.cache_params(args.width, args.use_trim)
+            params['exact'] = args.exact
+            cache_key = cache.make_key(image_bytes, params)
+            lines = cache.get(cache_key)
+            if lines is not None:
+                return '\n'.join(lines)
+
+        img = load_image_from_bytes(image_bytes, None if args.exact else args.width)
+        lines = converter.convert_to_ascii(img, args.width, trim=args.use_trim)
+        if cache is not None:
+            try:
+                cache.put(cache_key, lines)
+            except OSError as e:
+                print(f"Warning: Failed to write render cache: {e}")
+        return '\n'.join(lines)
+
+    def _work(self):
+        while True:
+            future, args, image_bytes = self.jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.render(args, image_bytes))
+                with self._counters_lock:
+                    self.completed += 1
+            except SystemExit:
+                # Loaders report their own errors and exit; keep the worker alive
+                future.set_exception(RequestError(f"Could not load image: {args.img_source}"))
+            except Exception as e:
+                future.set_exception(e)
+
+    def status(self):
+        """Return queue and worker counters"""
+        return {
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'queued': self.jobs.qsize(),
+            'completed': self.completed,
+            'rejected': self.rejected,
+        }
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end for a RenderService"""
+
+    server_version = 'ascii-painter'
+
+    def _send(self, status, body, content_type='text/plain; charset=utf-8'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, json.dumps(self.server.service.status()), 'application/json')
+        else:
+            self._send(404, "Not found\n")
+
+    def do_POST(self):
+        if self.path != '/render':
+            self._send(404, "Not found\n")
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            args, image_bytes = parse_request(payload)
+        except (ValueError, RequestError) as e:
+            self._send(400, f"Error: {e}\n")
+            return
+
+        try:
+            future = self.server.service.submit(args, image_bytes)
+        except queue.Full:
+            self.send_response(503)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        try:
+            text = future.result(timeout=SERVER_REQUEST_TIMEOUT)
+        except RequestError as e:
+            self._send(400, f"Error: {e}\n")
+        except FutureTimeoutError:
+            future.cancel()
+            self._send(504, "Error: Render timed out\n")
+        except Exception as e:
+            self._send(500, f"Error: {e}\n")
+        else:
+            self._send(200, text + '\n')
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"{self.address_string()} - {format % args}\n")
+
+
+def serve(host, port, workers=DEFAULT_SERVER_WORKERS, queue_size=DEFAULT_SERVER_QUEUE_SIZE,
+          use_cache=True):
+    """Run the render server until interrupted"""
+    httpd = ThreadingHTTPServer((host, port), RenderRequestHandler)
+    httpd.daemon_threads = True
+    httpd.service = RenderService(workers, queue_size, RenderCache() if use_cache else None)
+    print(f"Serving ASCII renders on http://{host}:{port} "
+          f"({workers} worker(s), queue of {queue_size}); Ctrl+C to stop")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
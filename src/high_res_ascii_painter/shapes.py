@@ -0,0 +1,80 @@
+"""
+Structure-aware glyph matching
+
+Each output cell is sampled as a small grid of sub-pixels (SHAPE_CELL_COLS x
+SHAPE_CELL_ROWS) and compared with every glyph's bitmap template at the same
+size. The glyph with the least squared error wins, so a cell holding an edge
+picks a glyph with ink on the matching side instead of one of the same
+average density.
+
+For a cell vector x and template t of n sub-pixels with means x_m and t_m,
+the squared error splits into a tone term n (x_m - t_m)^2, a shape term
+-2 x.(t - t_m) and the glyph's own texture |t - t_m|^2. The texture term
+is left out: it charges every busy glyph against a flat cell, which would
+fill solid areas with sparse, even glyphs. What remains, up to terms that
+do not depend on the glyph, is n t_m^2 - 2 x.t, so a flat cell picks the
+glyph of the nearest average ink and an edge picks a glyph with ink on the
+matching side.
+
+The score is computed for a whole block of cells at once, one
+(cells x sub-pixels) @ (sub-pixels x glyphs) matrix product plus a
+per-glyph constant. Cells are processed in blocks of whole rows so the
+score matrix stays within SHAPE_CHUNK_BYTES.
+"""
+
+import numpy as np
+from .config import (
+    BRIGHTNESS_OFFSET,
+    GAMMA_CORRECTION,
+    SHAPE_CELL_COLS,
+    SHAPE_CELL_ROWS,
+    SHAPE_CHUNK_BYTES
+)
+
+
+def ink_table(brightness=BRIGHTNESS_OFFSET, gamma=GAMMA_CORRECTION):
+    """
+    Return a 256-entry float32 table mapping a gray value to target ink (0.0 to 1.0)
+
+    Brightness and gamma are applied like the density ramp tables, so
+    brighter sub-pixels ask for more ink, except that the brightness offset
+    saturates at white instead of wrapping around. Shapes are matched
+    sub-pixel by sub-pixel, and a wrapped white stroke would read as empty.
+    """
+    values = np.minimum(np.arange(256) + brightness, 255).clip(0, None)
+    return np.power(values / 255.0, gamma).astype(np.float32)
+
+
+def match_shapes(arr_gray, templates, cols=SHAPE_CELL_COLS, rows=SHAPE_CELL_ROWS,
+                 chunk_bytes=SHAPE_CHUNK_BYTES, ink=None):
+    """
+    Map a (height * rows, width * cols) uint8 gray array to a (height, width)
+    matrix of template indices
+
+    templates is a (glyphs, rows * cols) array of ink per sub-pixel in
+    row-major order, as returned by glyph_templates. Target ink is scaled
+    by the densest glyph's average ink, so a white cell matches the densest
+    glyph and a black cell the emptiest.
+    """
+    if ink is None:
+        ink = ink_table()
+    ink = ink * np.float32(templates.mean(axis=1).max())
+    height, width = arr_gray.shape[0] // rows, arr_gray.shape[1] // cols
+    cells = arr_gray[:height * rows, :width * cols].reshape(height, rows, width, cols)
+
+    weights = -2 * np.ascontiguousarray(templates, dtype=np.float32).T
+    norms = np.square(templates.sum(axis=1, dtype=np.float32)) / (rows * cols)
+
+    # Each cell needs its sub-pixel vector and a row of scores
+    cell_bytes = 4 * (rows * cols + len(templates))
+    block_rows = max(1, chunk_bytes // max(1, width * cell_bytes))
+
+    indices = np.empty((height, width), dtype=np.uint8)
+    for start in range(0, height, block_rows):
+        block = cells[start:start + block_rows]
+        # (block_rows, rows, width, cols) -> one sub-pixel vector per cell
+        vectors = ink[block.transpose(0, 2, 1, 3).reshape(-1, rows * cols)]
+        scores = vectors @ weights
+        scores += norms
+        indices[start:start + block.shape[0]] = scores.argmin(axis=1).reshape(-1, width)
+    return indices
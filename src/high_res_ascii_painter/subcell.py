@@ -0,0 +1,131 @@
+"""
+Sub-cell rendering modes: half blocks, quadrant blocks and Braille
+
+These modes pack several sub-pixels into each character cell instead of a
+single brightness sample: half blocks stack two pixels per cell, quadrant
+blocks hold 2x2 and Braille patterns 2x4. Each sub-pixel is thresholded,
+and a cell's lit sub-pixels are packed into the bits of its glyph index,
+so a whole frame is mapped with one table lookup and one weighted sum.
+
+SubcellConverter plugs into everything built around ASCIIConverter
+(trimming, streaming, caching, batch, animation and delta output), since
+it produces the same glyph-index matrices.
+"""
+
+import numpy as np
+from PIL import Image
+from .config import (
+    DEFAULT_PALETTE,
+    DEFAULT_COLOR_BITS,
+    DEFAULT_GLYPH_SET,
+    DEFAULT_RENDER_MODE,
+    DEFAULT_TONE,
+    SUBCELL_INK_THRESHOLD
+)
+from .ascii_converter import ASCIIConverter
+from .cache import render_params
+from .dither import apply_dither
+from .shapes import ink_table
+from .tone import histogram
+
+# Sub-pixel weights per mode, as a (rows, cols) grid: a cell's glyph index is
+# the sum of the weights of its lit sub-pixels, which is also the offset of
+# its glyph in the mode's glyph string
+SUBCELL_WEIGHTS = {
+    'half': np.array([[1], [2]], dtype=np.uint8),
+    'quadrant': np.array([[1, 2], [4, 8]], dtype=np.uint8),
+    # Braille dots 1-3 and 7 run down the left column, 4-6 and 8 down the right
+    'braille': np.array([[0x01, 0x08], [0x02, 0x10], [0x04, 0x20], [0x40, 0x80]], dtype=np.uint8),
+}
+
+SUBCELL_GLYPHS = {
+    'half': ' ▀▄█',
+    'quadrant': ' ▘▝▀▖▌▞▛▗▚▐▜▄▙▟█',
+    'braille': ''.join(chr(0x2800 + bits) for bits in range(256)),
+}
+
+
+def lit_table(threshold=SUBCELL_INK_THRESHOLD, ink=None):
+    """Return a 256-entry bool table marking the gray values drawn as lit sub-pixels"""
+    return (ink_table() if ink is None else ink) >= threshold
+
+
+def pack_subcells(lit, weights):
+    """
+    Pack a (height * rows, width * cols) bool array into a (height, width)
+    matrix of glyph indices using a (rows, cols) weight grid
+    """
+    rows, cols = weights.shape
+    height, width = lit.shape[0] // rows, lit.shape[1] // cols
+    cells = lit[:height * rows, :width * cols].reshape(height, rows, width, cols)
+    # The weights are distinct bits, so the sum fits in a byte
+    return np.einsum('hrwc,rc->hw', cells.astype(np.uint8), weights, dtype=np.uint8)
+
+
+class SubcellConverter(ASCIIConverter):
+    """
+    Converts images with several sub-pixels per character cell
+
+    In color mode, half blocks give each cell two colors, drawing '▀' with
+    the upper pixel as the foreground and the lower one as the background.
+    Quadrant and Braille cells take the average color of the cell as their
+    foreground, like text mode.
+    """
+
+    def __init__(self, use_color=False, palette=DEFAULT_PALETTE, color_bits=DEFAULT_COLOR_BITS,
+                 mode='braille', dither=None, tone=DEFAULT_TONE):
+        if mode not in SUBCELL_WEIGHTS:
+            raise ValueError(f"Unknown sub-cell mode '{mode}'. Choose from: {', '.join(SUBCELL_WEIGHTS)}")
+        super().__init__(use_color, palette, color_bits, dither=dither, tone=tone)
+        self.mode = mode
+        self.weights = SUBCELL_WEIGHTS[mode]
+        self.cell_samples = self.weights.shape[::-1]
+        # Dithering works on the ink each sub-pixel asks for, against unlit and lit dots
+        self.ink = ink_table(self.tone_preset['brightness'], self.tone_preset['gamma'])
+        self.lit = lit_table(ink=self.ink)
+        self.lut = None
+        self.levels = np.array([0.0, 1.0], dtype=np.float32)
+        self.level_indices = None
+        self.pairs = mode == 'half' and use_color
+        # Two-color half blocks are always drawn with the upper half block
+        self.density = '▀' * 4 if self.pairs else SUBCELL_GLYPHS[mode]
+        self.n = len(self.density)
+        self.codepoints = np.array([ord(c) for c in self.density], dtype=np.uint32)
+        # Only cells with no lit sub-pixel count as background when trimming
+        self.background_indices = [0]
+
+    def cache_params(self, width, trim=False):
+        """Return every setting that affects the rendered output, for cache keys"""
+        return render_params(width, trim, self.use_color, self.palette, self.color_bits,
+                             mode=self.mode, dither=self.dither, tone=self.tone)
+
+    def resample(self, img_gray, img_color, width, height):
+        """
+        Resize to the sub-pixel grid, plus one color per cell (two for color half blocks)
+
+        In color half-block mode the colors are returned as an (h, w, 2, 3)
+        array of upper and lower pixels.
+        """
+        if not self.pairs or img_color is None:
+            return super().resample(img_gray, img_color, width, height)
+        img_gray, _ = super().resample(img_gray, None, width, height)
+        # (2h, w, 3) -> (h, w, 2, 3): the upper and lower pixel of each cell
+        arr_color = np.asarray(img_color.resize((width, height * 2), Image.Resampling.LANCZOS))
+        return img_gray, arr_color.reshape(height, 2, width, 3).transpose(0, 2, 1, 3)
+
+    def map_to_indices(self, arr_gray, curve=None):
+        """Map a sub-pixel gray array to a matrix of packed glyph indices, after the tone curve"""
+        if curve is None:
+            curve = self.tone_curve(histogram(arr_gray))
+        if self.dither:
+            lit = apply_dither(self.ink[curve][arr_gray], self.levels, self.dither).astype(bool)
+        else:
+            lit = self.lit[curve][arr_gray]
+        return pack_subcells(lit, self.weights)
+
+
+def create_converter(mode=DEFAULT_RENDER_MODE, glyphs=DEFAULT_GLYPH_SET, shape=False, **options):
+    """Create the converter for a render mode: ASCIIConverter for 'text', SubcellConverter otherwise"""
+    if mode == 'text':
+        return ASCIIConverter(glyphs=glyphs, shape=shape, **options)
+    return SubcellConverter(mode=mode, **options)
@@ -0,0 +1,257 @@
+"""
+Tiled, memory-bounded conversion for very large images
+
+The source is read in horizontal strips, each strip is box-filtered down to
+the output rows it covers, and those rows are rendered and yielded before the
+next strip is read. Peak memory is one strip plus the output cells.
+
+Strips are read straight from the file at computed offsets for .npy arrays
+and for uncompressed images PIL can describe as raw tiles (PPM/PGM,
+uncompressed TIFF, BMP). Other formats have to be decoded whole by PIL first;
+JPEGs are decoded at a reduced scale, and anything else past PIL's
+decompression bomb limit is rejected instead of exhausting memory.
+"""
+
+import os
+import numpy as np
+from .config import (
+    ASPECT_RATIO_CORRECTION,
+    TILED_STRIP_BYTES,
+    TILED_SAMPLE_ROWS
+)
+from .ascii_converter import luminance
+from .image_loader import reduce_for_width
+from .tone import histogram
+
+# Raw pixel layouts that can be read directly: bytes per pixel and the slice
+# of each pixel's bytes giving R, G, B (None for single-channel gray)
+RAW_LAYOUTS = {
+    'L': (1, None),
+    'RGB': (3, slice(0, 3)),
+    'BGR': (3, slice(2, None, -1)),
+    'RGBA': (4, slice(0, 3)),
+    'RGBX': (4, slice(0, 3)),
+    'BGRA': (4, slice(2, None, -1)),
+    'BGRX': (4, slice(2, None, -1)),
+}
+
+
+class RawStripReader:
+    """
+    Reads rows of an uncompressed image from its raw pixel bands in the file
+
+    Each band is (y0, y1, offset, stride, orientation): the image rows it
+    holds, where its first stored row starts, the bytes per stored row, and
+    -1 for bands stored bottom-up.
+    """
+
+    def __init__(self, path, width, height, rawmode, bands):
+        if rawmode not in RAW_LAYOUTS:
+            raise ValueError(f"Unsupported raw pixel layout '{rawmode}'")
+        self.path = path
+        self.width = width
+        self.height = height
+        self.bytes_per_pixel, self.channel_slice = RAW_LAYOUTS[rawmode]
+        self.channels = 1 if self.channel_slice is None else 3
+        self.bands = bands
+
+    @classmethod
+    def from_pil_tiles(cls, path, img):
+        """Build a reader from the tile list of an opened, not yet loaded PIL image"""
+        width, height = img.size
+        rawmodes = set()
+        bands = []
+        for codec, extents, offset, args in img.tile:
+            rawmode, stride, orientation = (args, 0, 1) if isinstance(args, str) else (tuple(args) + (0, 1))[:3]
+            x0, y0, x1, y1 = extents
+            if codec != 'raw' or x0 != 0 or x1 != width or rawmode not in RAW_LAYOUTS:
+                raise ValueError("Image is not stored as full-width raw pixel bands")
+            rawmodes.add(rawmode)
+            stride = stride or width * RAW_LAYOUTS[rawmode][0]
+            bands.append((y0, y1, offset, stride, orientation or 1))
+        if len(rawmodes) != 1:
+            raise ValueError("Image mixes raw pixel layouts")
+        return cls(path, width, height, rawmodes.pop(), bands)
+
+    @classmethod
+    def from_npy(cls, path):
+        """Build a reader for a C-ordered uint8 (H, W) or (H, W, 3|4) .npy array"""
+        with open(path, 'rb') as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+        channels = 1 if len(shape) == 2 else shape[2] if len(shape) == 3 else 0
+        if dtype != np.uint8 or fortran_order or channels not in (1, 3, 4):
+            raise ValueError(f"Expected a C-ordered uint8 (H, W) or (H, W, 3) array, got {dtype} {shape}")
+        height, width = shape[:2]
+        rawmode = {1: 'L', 3: 'RGB', 4: 'RGBA'}[channels]
+        return cls(path, width, height, rawmode, [(0, height, offset, width * channels, 1)])
+
+    def read_rows(self, y0, y1):
+        """Return rows y0..y1 as a uint8 (rows, W) or (rows, W, 3) array"""
+        out = np.empty((y1 - y0, self.width) + (() if self.channels == 1 else (3,)), dtype=np.uint8)
+        row_bytes = self.width * self.bytes_per_pixel
+        with open(self.path, 'rb') as f:
+            for band_y0, band_y1, offset, stride, orientation in self.bands:
+                top, bottom = max(y0, band_y0), min(y1, band_y1)
+                if top >= bottom:
+                    continue
+                # Bottom-up bands store their last row first
+                if orientation < 0:
+                    first = band_y1 - bottom
+                else:
+                    first = top - band_y0
+                count = bottom - top
+                f.seek(offset + first * stride)
+                raw = np.fromfile(f, dtype=np.uint8, count=count * stride)
+                if raw.size != count * stride:
+                    raise ValueError(f"{self.path} is truncated")
+                pixels = raw.reshape(count, stride)[:, :row_bytes].reshape(count, self.width, self.bytes_per_pixel)
+                if orientation < 0:
+                    pixels = pixels[::-1]
+                if self.channels == 1:
+                    out[top - y0:bottom - y0] = pixels[..., 0]
+                else:
+                    out[top - y0:bottom - y0] = pixels[..., self.channel_slice]
+        return out
+
+
+class DecodedStripReader:
+    """Fallback for compressed formats: decodes the image once, then slices rows"""
+
+    def __init__(self, img, width):
+        from PIL import Image
+
+        max_pixels = Image.MAX_IMAGE_PIXELS
+        if max_pixels and img.size[0] * img.size[1] > 2 * max_pixels and img.format != 'JPEG':
+            raise ValueError(
+                f"{img.format or 'This'} images must be fully decoded, and {img.size[0]}x{img.size[1]} "
+                "pixels is past PIL's safety limit. Convert it to uncompressed TIFF, PPM or .npy "
+                "to convert it in strips")
+        img = reduce_for_width(img, width)
+        self.channels = 1 if img.mode in ('1', 'L', 'LA', 'I', 'F') else 3
+        self.array = np.asarray(img.convert('L' if self.channels == 1 else 'RGB'))
+        self.height, self.width = self.array.shape[:2]
+
+    def read_rows(self, y0, y1):
+        return self.array[y0:y1]
+
+
+def open_strip_reader(path, width):
+    """Open a strip reader for path, reading raw pixel rows directly when the format allows it"""
+    if path.lower().endswith('.npy'):
+        return RawStripReader.from_npy(path)
+
+    from PIL import Image
+
+    # Only the header is read here; pixels are never decoded in the raw case
+    max_pixels = Image.MAX_IMAGE_PIXELS
+    Image.MAX_IMAGE_PIXELS = None
+    try:
+        img = Image.open(path)
+    finally:
+        Image.MAX_IMAGE_PIXELS = max_pixels
+    if img.mode in ('L', 'RGB', 'RGBA', 'RGBX') and img.tile:
+        try:
+            return RawStripReader.from_pil_tiles(path, img)
+        except ValueError:
+            pass
+    return DecodedStripReader(img, width)
+
+
+def bin_edges(source_size, output_size):
+    """Start index of each of output_size near-equal bins over source_size"""
+    return (np.arange(output_size, dtype=np.int64) * source_size // output_size).astype(np.intp)
+
+
+def sample_histogram(reader, gray_rows, sample_rows=TILED_SAMPLE_ROWS):
+    """Estimate the gray histogram from evenly spaced source rows"""
+    rows = np.unique(np.linspace(0, reader.height - 1, min(sample_rows, reader.height)).astype(np.intp))
+    hist = np.zeros(256, dtype=np.int64)
+    for y in rows:
+        hist += histogram(gray_rows(reader.read_rows(y, y + 1)))
+    return hist
+
+
+def iter_tiled_cells(reader, converter, width, strip_bytes=TILED_STRIP_BYTES):
+    """
+    Yield (indices, arr_color) blocks of output rows, reading one strip at a time
+
+    Each output cell is the box average of the source pixels it covers, so
+    results differ slightly from the LANCZOS path. The tone curve is built
+    from a histogram of sampled rows, so the first strip can be rendered
+    before the rest of the image has been read.
+    """
+    # Box filtering can only shrink, so the output is capped at the source size
+    width = min(width, reader.width)
+    height = min(max(1, int(width * reader.height / reader.width * ASPECT_RATIO_CORRECTION)),
+                 reader.height)
+    row_edges = np.append(bin_edges(reader.height, height), reader.height)
+    col_edges = bin_edges(reader.width, width)
+    col_counts = np.diff(np.append(col_edges, reader.width))
+
+    def gray_rows(pixels):
+        return pixels if reader.channels == 1 else luminance(pixels)
+
+    curve = converter.tone_curve(sample_histogram(reader, gray_rows))
+    row_bytes = reader.width * reader.channels
+
+    row = 0
+    while row < height:
+        # Take as many whole output rows as fit in the strip budget (at least one)
+        end = row + 1
+        while end < height and (row_edges[end + 1] - row_edges[row]) * row_bytes <= strip_bytes:
+            end += 1
+        y0, y1 = row_edges[row], row_edges[end]
+        pixels = reader.read_rows(y0, y1)
+
+        # Sum each cell's pixels, then divide with rounding by the cell's pixel count.
+        # Rows are summed per output row first; reduceat over the whole strip
+        # would cast a full wide-integer copy of it.
+        row_sums = np.stack([pixels[a - y0:b - y0].sum(axis=0, dtype=np.uint32)
+                             for a, b in zip(row_edges[row:end], row_edges[row + 1:end + 1])])
+        del pixels
+        sums = np.add.reduceat(row_sums, col_edges, axis=1, dtype=np.uint64)
+        counts = np.diff(row_edges[row:end + 1])[:, None] * col_counts[None, :]
+        if reader.channels == 3:
+            counts = counts[..., None]
+        cells = ((sums + counts // 2) // counts).astype(np.uint8)
+
+        gray = cells if reader.channels == 1 else luminance(cells)
+        arr_color = None
+        if converter.use_color:
+            arr_color = cells if reader.channels == 3 else np.repeat(cells[..., None], 3, axis=2)
+
+        yield converter.map_to_indices(gray, curve), arr_color
+        row = end
+
+
+def iter_tiled_lines(path, converter, width, trim=False, strip_bytes=TILED_STRIP_BYTES):
+    """
+    Convert a large image file strip by strip, returning an iterator of output lines
+
+    The file is opened up front, so unreadable sources raise here rather
+    than on the first line. With trim, the (small) glyph matrix is kept until
+    the end, because the background bounds are only known once every row
+    has been seen.
+    """
+    reader = open_strip_reader(os.fspath(path), width)
+    blocks = iter_tiled_cells(reader, converter, width, strip_bytes)
+    if not trim:
+        return (line for indices, arr_color in blocks
+                for line in converter.render_lines(indices, arr_color))
+    return _trimmed_lines(blocks, converter)
+
+
+def _trimmed_lines(blocks, converter):
+    all_indices, all_colors = [], []
+    for indices, arr_color in blocks:
+        all_indices.append(indices)
+        all_colors.append(arr_color)
+    indices = np.concatenate(all_indices)
+    arr_color = np.concatenate(all_colors) if converter.use_color else None
+    indices, arr_color, row_lengths = converter.trim_indices(indices, arr_color)
+    yield from converter.render_lines(indices, arr_color, row_lengths)
@@ -3,16 +3,29 @@ Utility functions for ASCII art generator
 """
 
 import os
-import tempfile
-import subprocess
 import re
-from datetime import datetime
-from .config import DENSITY_STRING
+from .config import DENSITY_STRING, OUTPUT_CHUNK_BYTES
 
+# NumPy is imported inside the array helpers, so the terminal, output and
+# clipboard helpers stay cheap to import
 
-def get_ansi_color(r, g, b):
-    """Convert RGB to ANSI 256-color code"""
-    return f'\033[38;2;{r};{g};{b}m'
+
+def get_ansi_color(r, g, b, background=False):
+    """Convert RGB to ANSI truecolor code (foreground, or background if set)"""
+    return f'\033[{48 if background else 38};2;{r};{g};{b}m'
+
+
+def get_ansi_color_256(index, background=False):
+    """Convert an xterm palette index to ANSI 256-color code"""
+    return f'\033[{48 if background else 38};5;{index}m'
+
+
+def get_ansi_color_16(index, background=False):
+    """Convert a basic palette index (0-15) to ANSI 16-color code"""
+    code = 30 + index if index < 8 else 90 + index - 8
+    if background:
+        code += 10
+    return f'\033[{code}m'
 
 
 def reset_color():
@@ -20,6 +33,41 @@ def reset_color():
     return '\033[0m'
 
 
+def cursor_home():
+    """Move the cursor to the top-left corner of the terminal"""
+    return '\033[H'
+
+
+def move_cursor(row, col):
+    """Move the cursor to a 1-based terminal row and column"""
+    return f'\033[{row};{col}H'
+
+
+def clear_screen():
+    """Clear the whole terminal"""
+    return '\033[2J'
+
+
+def clear_line_end():
+    """Clear from the cursor to the end of the line"""
+    return '\033[K'
+
+
+def clear_screen_end():
+    """Clear from the cursor to the end of the screen"""
+    return '\033[J'
+
+
+def hide_cursor():
+    """Hide the terminal cursor"""
+    return '\033[?25l'
+
+
+def show_cursor():
+    """Show the terminal cursor again"""
+    return '\033[?25h'
+
+
 def strip_ansi_codes(text):
     """
     Remove ANSI color codes from text
@@ -30,11 +78,43 @@ def strip_ansi_codes(text):
     return ansi_pattern.sub('', text)
 
 
+def write_lines(lines, stream, chunk_bytes=OUTPUT_CHUNK_BYTES):
+    """
+    Write lines (each followed by a newline) to stream in large chunks
+
+    Lines are gathered until about chunk_bytes characters are pending and
+    then written with a single call, so a generator of rows can be streamed
+    to a file or pipe without building the whole text. Returns the number
+    of lines written.
+    """
+    pending = []
+    pending_size = 0
+    count = 0
+    for line in lines:
+        pending.append(line)
+        pending_size += len(line) + 1
+        count += 1
+        if pending_size >= chunk_bytes:
+            pending.append('')
+            stream.write('\n'.join(pending))
+            pending = []
+            pending_size = 0
+    if pending:
+        pending.append('')
+        stream.write('\n'.join(pending))
+    stream.flush()
+    return count
+
+
 def save_clipboard_image():
     """
     Save clipboard image to a temporary file using PowerShell (WSL compatible)
     Returns the path to the saved image file
     """
+    import subprocess
+    import tempfile
+    from datetime import datetime
+    
     # Create temporary file
     temp_dir = tempfile.gettempdir()
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -81,6 +161,8 @@ def copy_to_clipboard(text):
     """
     Copy text to clipboard using PowerShell (WSL compatible)
     """
+    import subprocess
+    
     # PowerShell command to copy text to clipboard
     powershell_cmd = [
         'powershell.exe', '-NoProfile', '-Command',
@@ -102,8 +184,49 @@ def copy_to_clipboard(text):
         return False
 
 
+def background_characters(density=DENSITY_STRING):
+    """
+    Return the characters treated as background when trimming
+    Includes both the lightest character (space) and the second-to-last ('.')
+    """
+    if not density:
+        return {' ', '.'}
+    return set(density[-2:])
+
+
+def content_bounds(mask):
+    """
+    Find the bounding box of the True cells of a 2D content mask
+
+    Returns (row_slice, col_slice, row_lengths), where row_lengths holds the
+    length of each cropped row once its trailing background is dropped, or
+    None when the mask has no content at all.
+    """
+    import numpy as np
+    
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(mask.any(axis=0))
+    row_slice = slice(int(rows[0]), int(rows[-1]) + 1)
+    col_slice = slice(int(cols[0]), int(cols[-1]) + 1)
+
+    cropped = mask[row_slice, col_slice]
+    width = cropped.shape[1]
+    last_content = width - np.argmax(cropped[:, ::-1], axis=1)
+    row_lengths = np.where(cropped.any(axis=1), last_content, 0)
+    return row_slice, col_slice, row_lengths
+
+
 def trim_ascii_art(ascii_lines):
-    """Remove background rows and columns from ASCII art for compact output"""
+    """
+    Remove background rows and columns from plain ASCII art for compact output
+
+    Works on already built lines. ASCIIConverter.convert_to_ascii(trim=True)
+    trims the glyph matrix instead, which also works in color mode.
+    """
+    import numpy as np
+    
     if not ascii_lines:
         return ascii_lines
     
@@ -112,97 +235,22 @@ def trim_ascii_art(ascii_lines):
     if not lines:
         return lines
     
-    # Find background characters (lightest characters in our density string)
-    # Include both space and the second-to-last character (which is usually '.')
-    background_chars = set()
-    if DENSITY_STRING:
-        background_chars.add(DENSITY_STRING[-1])  # Last character (space)
-        if len(DENSITY_STRING) > 1:
-            background_chars.add(DENSITY_STRING[-2])  # Second to last character ('.')
-    else:
-        background_chars = {' ', '.'}
+    background_chars = background_characters()
     
-    # Debug: print background characters
-    print(f"Debug: Background characters detected: {background_chars}")
-    print(f"Debug: Density string: '{DENSITY_STRING}'")
-    
-    def is_background_only(text):
-        """Check if text contains only background characters"""
-        return all(char in background_chars for char in text.strip())
-    
-    # Remove background-only rows from top and bottom
-    # Find first non-background row
-    start_row = 0
-    for i, line in enumerate(lines):
-        if not is_background_only(line):
-            start_row = i
-            break
-    else:
-        # All lines are background only
+    # Lay the lines out as a matrix of code points; short lines are padded
+    # with NUL, which counts as background like a missing character would
+    max_width = max(len(line) for line in lines)
+    if max_width == 0:
         return []
-    
-    # Find last non-background row
-    end_row = len(lines) - 1
-    for i in range(len(lines) - 1, -1, -1):
-        if not is_background_only(lines[i]):
-            end_row = i
-            break
-    
-    # Trim rows
-    trimmed_lines = lines[start_row:end_row + 1]
-    
-    if not trimmed_lines:
-        return []
-    
-    # Remove background-only columns from left and right
-    max_width = max(len(line) for line in trimmed_lines)
-    
-    # Find first non-background column
-    start_col = max_width
-    for j in range(max_width):
-        column_chars = []
-        for line in trimmed_lines:
-            if j < len(line):
-                column_chars.append(line[j])
-        
-        # Check if this column has any non-background characters
-        if any(char not in background_chars for char in column_chars):
-            start_col = j
-            break
-    
-    # Find last non-background column
-    end_col = -1
-    for j in range(max_width - 1, -1, -1):
-        column_chars = []
-        for line in trimmed_lines:
-            if j < len(line):
-                column_chars.append(line[j])
-        
-        # Check if this column has any non-background characters
-        if any(char not in background_chars for char in column_chars):
-            end_col = j
-            break
-    
-    # If no non-background characters found
-    if start_col >= max_width or end_col < 0:
+    codes = np.array(lines, dtype=f'U{max_width}').view(np.uint32).reshape(len(lines), max_width)
+    background_codes = [ord(char) for char in background_chars] + [0]
+    bounds = content_bounds(np.isin(codes, background_codes, invert=True))
+    if bounds is None:
         return []
     
-    # Trim columns
-    result = []
-    for line in trimmed_lines:
-        if end_col + 1 <= len(line):
-            trimmed_line = line[start_col:end_col + 1]
-        else:
-            # Handle lines shorter than end_col
-            if start_col < len(line):
-                trimmed_line = line[start_col:]
-            else:
-                trimmed_line = ""
-        
-        # Remove trailing background characters
-        while trimmed_line and trimmed_line[-1] in background_chars:
-            trimmed_line = trimmed_line[:-1]
-        
-        result.append(trimmed_line)
-    
-    return result
+    row_slice, col_slice, row_lengths = bounds
+    start_col = col_slice.start
+    return [
+        line[start_col:start_col + length]
+        for line, length in zip(lines[row_slice], row_lengths.tolist())
+    ]
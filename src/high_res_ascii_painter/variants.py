@@ -0,0 +1,169 @@
+"""
+Several renders of one image from a single decode
+
+Each upload is usually needed at a few sizes and styles (a Slack width and
+a wider preview, color and mono, trimmed and untrimmed). Rendering them one
+by one reloads and re-resizes the source every time. Here the image is
+decoded once and converted to the one color mode every variant can start
+from, then halved repeatedly into a resolution pyramid. Each variant is
+resampled from the smallest level that still has VARIANT_OVERSAMPLE source
+pixels per sample, so a narrow variant never resizes the full-size image.
+All variants are written in one pass, with a JSON manifest describing them.
+
+PIL and NumPy are imported inside the functions that use them, so the CLI
+can parse variant specs without loading them.
+"""
+
+import json
+import os
+from collections import namedtuple
+from .config import DEFAULT_GLYPH_SET, RENDER_MODES, VARIANT_OVERSAMPLE
+
+Variant = namedtuple('Variant', 'width mode color trim')
+
+
+def parse_variants(spec, mode='text', color=False, trim=False):
+    """
+    Parse a --variants spec into a list of Variant
+
+    spec is a comma-separated list of WIDTH[:FLAG...] items. Flags are a
+    render mode, 'color' or 'mono', and 'trim' or 'full'. Settings a
+    variant leaves out come from mode, color and trim. Raises ValueError
+    for malformed specs.
+    """
+    variants = []
+    for item in spec.split(','):
+        width, *flags = item.strip().split(':')
+        if not width.isdigit() or int(width) < 1:
+            raise ValueError(f"Variant '{item}' must start with a positive width")
+        variant = Variant(int(width), mode, color, trim)
+        for flag in flags:
+            if flag in RENDER_MODES:
+                variant = variant._replace(mode=flag)
+            elif flag in ('color', 'mono'):
+                variant = variant._replace(color=flag == 'color')
+            elif flag in ('trim', 'full'):
+                variant = variant._replace(trim=flag == 'trim')
+            else:
+                raise ValueError(f"Unknown variant flag '{flag}'. Use a mode "
+                                 f"({', '.join(RENDER_MODES)}), color, mono, trim or full")
+        if variant not in variants:
+            variants.append(variant)
+    return variants
+
+
+def variant_name(stem, variant):
+    """File name of a variant's output, e.g. photo-60-text-mono-trim.txt"""
+    name = f"{stem}-{variant.width}-{variant.mode}-{'color' if variant.color else 'mono'}"
+    return name + ('-trim' if variant.trim else '') + '.txt'
+
+
+def build_pyramid(img, min_size):
+    """
+    Return [img, img / 2, img / 4, ...], stopping before a level would be
+    smaller than min_size (width, height) in either dimension
+    """
+    levels = [img]
+    while True:
+        width, height = levels[-1].size
+        if width // 2 < max(1, min_size[0]) or height // 2 < max(1, min_size[1]):
+            return levels
+        levels.append(levels[-1].reduce(2))
+
+
+def pick_level(levels, size):
+    """Index of the smallest pyramid level at least size (width, height), or 0 if none is"""
+    for index in range(len(levels) - 1, -1, -1):
+        width, height = levels[index].size
+        if width >= size[0] and height >= size[1]:
+            return index
+    return 0
+
+
+def source_size(converter, img, width):
+    """Pixels a variant should be resampled from: VARIANT_OVERSAMPLE per sample of its grid"""
+    cols, rows = converter.cell_samples
+    # Color half blocks sample two pixel rows per cell even when the gray grid does not
+    rows = max(rows, 2) if converter.use_color else rows
+    _, height = converter.output_size(img, width)
+    return width * cols * VARIANT_OVERSAMPLE, max(1, height) * rows * VARIANT_OVERSAMPLE
+
+
+def render_variants(img, variants, glyphs=DEFAULT_GLYPH_SET, shape=False, **options):
+    """
+    Render every variant from one decoded image
+
+    Returns (levels, results): the pyramid, built up front, and an iterator
+    of (variant, level, lines) rendered as it is consumed, where level
+    indexes the pyramid level the variant was resampled from. options are
+    passed to create_converter (palette, color_bits, dither, tone); glyphs
+    and shape only apply to text-mode variants.
+    """
+    from .subcell import create_converter
+
+    converters = {}
+    for variant in variants:
+        if (variant.mode, variant.color) not in converters:
+            text_options = {'glyphs': glyphs, 'shape': shape} if variant.mode == 'text' else {}
+            converters[variant.mode, variant.color] = create_converter(
+                mode=variant.mode, use_color=variant.color, **text_options, **options)
+
+    # Convert once to the mode every variant can start from: gray unless one needs color
+    base = img.convert('RGB' if any(variant.color for variant in variants) else 'L')
+    sizes = [source_size(converters[variant.mode, variant.color], base, variant.width)
+             for variant in variants]
+    levels = build_pyramid(base, (min(size[0] for size in sizes), min(size[1] for size in sizes)))
+
+    def results():
+        for variant, size in zip(variants, sizes):
+            level = pick_level(levels, size)
+            converter = converters[variant.mode, variant.color]
+            # The grid comes from the base size, so every variant matches a direct render's shape
+            img_gray, img_color, _, _ = converter.prepare_image(levels[level], variant.width, base.size)
+            indices, arr_color, row_lengths = converter.map_prepared(img_gray, img_color, variant.trim)
+            yield variant, level, converter.render_lines(indices, arr_color, row_lengths)
+
+    return levels, results()
+
+
+def write_variants(img, variants, output_dir, stem, source=None, glyphs=DEFAULT_GLYPH_SET,
+                   shape=False, **options):
+    """
+    Render every variant of img into output_dir and write a manifest
+
+    Outputs are named by variant_name, and the manifest is written to
+    <stem>-variants.json last, so its presence means every file is done.
+    Returns the manifest path.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    entries = []
+    levels, results = render_variants(img, variants, glyphs, shape, **options)
+    for variant, level, lines in results:
+        name = variant_name(stem, variant)
+        text = ''.join(line + '\n' for line in lines)
+        with open(os.path.join(output_dir, name), 'w', encoding='utf-8') as f:
+            f.write(text)
+        entries.append({
+            'file': name,
+            'width': variant.width,
+            'lines': len(lines),
+            'mode': variant.mode,
+            'color': variant.color,
+            'trim': variant.trim,
+            'level': level,
+            'chars': len(text),
+            'bytes': len(text.encode('utf-8')),
+        })
+
+    manifest = {
+        'source': source,
+        'size': list(img.size),
+        'pyramid': [list(level.size) for level in levels],
+        'options': {'glyphs': glyphs, 'shape': shape, **options},
+        'variants': entries,
+    }
+    path = os.path.join(output_dir, f"{stem}-variants.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    return path
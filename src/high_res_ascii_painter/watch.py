@@ -0,0 +1,241 @@
+"""
+Watch mode: re-render an image in place every time its file is saved
+
+The source path is polled with os.stat every WATCH_POLL_INTERVAL seconds;
+polling one path is cheap and works the same on Linux, macOS, Windows and
+WSL mounts, where inotify events from the Windows side never arrive. A
+change is only picked up once the file has stopped changing for
+WATCH_DEBOUNCE seconds, so an editor writing in several steps triggers one
+render. The file is then hashed and only re-rendered if its content
+changed, which skips saves that touch the file without changing it.
+
+The decoded image and the glyph cells of every width shown so far are kept
+in memory, so resizing with + and - or toggling trim with t re-renders
+without reading or decoding the file again. Frames are drawn in place
+through a DeltaRenderer, which only rewrites the cells that changed.
+"""
+
+import codecs
+import hashlib
+import os
+import sys
+import time
+from io import BytesIO
+from .config import DRAFT_OVERSAMPLE, WATCH_DEBOUNCE, WATCH_POLL_INTERVAL, WATCH_WIDTH_STEP
+from .delta import DeltaRenderer
+from .image_loader import reduce_for_width
+from .utils import clear_line_end, clear_screen, hide_cursor, reset_color, show_cursor
+
+
+def file_signature(path):
+    """Return (mtime_ns, size) of path, or None if it cannot be read"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SourceWatcher:
+    """Reports the content of a file each time it changes and then settles"""
+
+    def __init__(self, path, debounce=WATCH_DEBOUNCE):
+        self.path = path
+        self.debounce = debounce
+        self.signature = None
+        self.digest = None
+        self.changed_at = None
+
+    def poll(self, now):
+        """Return the file's bytes if it changed and has been stable for debounce seconds, else None"""
+        signature = file_signature(self.path)
+        if signature != self.signature:
+            self.signature = signature
+            self.changed_at = now
+            return None
+        if self.changed_at is None or now - self.changed_at < self.debounce or signature is None:
+            return None
+        self.changed_at = None
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        digest = hashlib.sha256(data).digest()
+        if digest == self.digest:
+            return None
+        self.digest = digest
+        return data
+
+
+class WatchedImage:
+    """
+    The current source: its bytes, the decoded image and the untrimmed
+    glyph cells of every width rendered since it last changed
+    """
+
+    def __init__(self, converter, exact=False):
+        self.converter = converter
+        self.exact = exact
+        self.data = None
+        self.img = None
+        self.decoded_width = None
+        self.cells = {}
+
+    def update(self, data):
+        """Replace the source with new file content"""
+        self.data = data
+        self.img = None
+        self.cells.clear()
+
+    def decoded(self, width):
+        """
+        Return the decoded image for width; a reduced decode is only redone
+        from the kept bytes when the width grows past what it was reduced for
+        """
+        from PIL import Image
+
+        if self.img is None or (self.decoded_width is not None and width > self.decoded_width
+                                and self.img.size[0] < width * DRAFT_OVERSAMPLE):
+            img = Image.open(BytesIO(self.data))
+            full_size = img.size
+            if not self.exact:
+                img = reduce_for_width(img, width)
+            img.load()
+            self.img = img
+            # Full-size decodes never need redoing
+            self.decoded_width = width if img.size != full_size else None
+            self.cells.clear()
+        return self.img
+
+    def render_cells(self, width, trim=False):
+        """Return (indices, arr_color) for width, trimmed if requested"""
+        cells = self.cells.get(width)
+        if cells is None:
+            indices, arr_color, _ = self.converter.convert_to_cells(self.decoded(width), width)
+            cells = self.cells[width] = (indices, arr_color)
+        if not trim:
+            return cells
+        indices, arr_color, _ = self.converter.trim_indices(*cells)
+        return indices, arr_color
+
+
+class KeyReader:
+    """
+    Reads single key presses without waiting for Enter
+
+    Uses cbreak mode on POSIX terminals and msvcrt on Windows. When stdin is
+    not a terminal, read only waits for the timeout. POSIX keys are read
+    from the file descriptor, not the buffered stream, so keys typed
+    together are not pulled into a buffer select cannot see.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdin
+        self.saved = None
+        self.msvcrt = None
+        self.decoder = codecs.getincrementaldecoder(getattr(self.stream, 'encoding', None) or 'utf-8')(
+            errors='replace')
+
+    def __enter__(self):
+        if not self.stream.isatty():
+            return self
+        try:
+            import msvcrt
+            self.msvcrt = msvcrt
+        except ImportError:
+            import termios
+            import tty
+            self.saved = termios.tcgetattr(self.stream)
+            tty.setcbreak(self.stream)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.saved is not None:
+            import termios
+            termios.tcsetattr(self.stream, termios.TCSADRAIN, self.saved)
+
+    def read(self, timeout):
+        """Return the next key pressed within timeout seconds, or None"""
+        if self.msvcrt is not None:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                if self.msvcrt.kbhit():
+                    return self.msvcrt.getwch()
+                time.sleep(0.02)
+            return None
+        if self.saved is None:
+            time.sleep(timeout)
+            return None
+        import select
+        fd = self.stream.fileno()
+        ready, _, _ = select.select([fd], [], [], timeout)
+        if not ready:
+            return None
+        # A multi-byte key is returned once its last byte has been read
+        return self.decoder.decode(os.read(fd, 1)) or None
+
+
+def watch(path, converter, width, trim=False, exact=False, stream=None,
+          poll_interval=WATCH_POLL_INTERVAL, debounce=WATCH_DEBOUNCE):
+    """
+    Re-render path in place whenever its content changes, until q or Ctrl+C
+
+    + and - change the width by WATCH_WIDTH_STEP and t toggles trimming.
+    Files that cannot be decoded (for example while an editor is still
+    writing them) are reported on the status line and retried on the next
+    change. Returns the number of renders drawn.
+    """
+    stream = stream or sys.stdout
+    watcher = SourceWatcher(path, debounce)
+    source = WatchedImage(converter, exact)
+    renderer = DeltaRenderer(converter)
+    renders = 0
+    error = None
+
+    stream.write(hide_cursor() + clear_screen())
+    stream.flush()
+    try:
+        with KeyReader() as keys:
+            while True:
+                redraw = False
+                data = watcher.poll(time.monotonic())
+                if data is not None:
+                    source.update(data)
+                    redraw = True
+
+                key = keys.read(poll_interval)
+                if key in ('q', 'Q'):
+                    break
+                if key in ('+', '='):
+                    width += WATCH_WIDTH_STEP
+                    redraw = True
+                elif key in ('-', '_'):
+                    width = max(1, width - WATCH_WIDTH_STEP)
+                    redraw = True
+                elif key in ('t', 'T'):
+                    trim = not trim
+                    redraw = True
+
+                if not redraw or source.data is None:
+                    continue
+                try:
+                    indices, arr_color = source.render_cells(width, trim)
+                    error = None
+                except Exception as e:
+                    error = str(e)
+                    # Keep the last good frame on screen
+                    indices = None
+                if indices is not None:
+                    stream.write(renderer.render(indices, arr_color))
+                    renders += 1
+                status = f"Error: {error}" if error else \
+                    f"{os.path.basename(path)}  width {width}  trim {'on' if trim else 'off'}"
+                stream.write(f"{reset_color()}{status}  [+/-] width  [t] trim  [q] quit{clear_line_end()}\r")
+                stream.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stream.write(reset_color() + show_cursor() + '\n')
+        stream.flush()
+    return renders
@@ -0,0 +1,28 @@
+import io
+
+from PIL import Image
+
+from high_res_ascii_painter import fetcher
+from high_res_ascii_painter.batch import run_batch
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.linear_gradient('L').resize((64, 48)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def test_web_batch_rejects_non_image_responses(tmp_path, monkeypatch, capsys):
+    downloads = [
+        ('http://x/ok.png', png_bytes(), 'image/png', None),
+        ('http://x/login', b'<html>sign in</html>', 'text/html; charset=utf-8', None),
+    ]
+    monkeypatch.setattr(fetcher, 'fetch_many', lambda urls, cache=None: downloads)
+    monkeypatch.setattr(fetcher, 'HTTPCache', lambda: None)
+
+    failures = run_batch([url for url, *_ in downloads], str(tmp_path), 20, is_web=True, workers=1)
+
+    assert failures == 1
+    assert 'Failed: http://x/login: URL returned HTML instead of an image' in capsys.readouterr().out
+    assert (tmp_path / 'ok.txt').read_text(encoding='utf-8').strip()
+    assert not (tmp_path / 'login.txt').exists()
@@ -0,0 +1,63 @@
+import pytest
+from PIL import Image, ImageDraw
+
+from high_res_ascii_painter.ascii_converter import ASCIIConverter
+from high_res_ascii_painter.budget import fit_width, rendered_size
+
+
+def make_image(size=(240, 160)):
+    img = Image.linear_gradient('L').resize(size).convert('RGB')
+    ImageDraw.Draw(img).ellipse((20, 20, size[0] - 20, size[1] - 20), outline=(255, 255, 255), width=6)
+    return img
+
+
+@pytest.mark.parametrize('use_color', [False, True])
+def test_fitted_width_reproduces_a_direct_render(use_color):
+    converter = ASCIIConverter(use_color=use_color)
+    img = make_image()
+    budget = rendered_size(converter.convert_to_ascii(img, 30)) - 1
+
+    width, lines, size = fit_width(converter, img, 60, max_bytes=budget)
+
+    assert size <= budget
+    assert lines == converter.convert_to_ascii(img, width)
+    assert size == rendered_size(lines)
+
+
+def test_max_width_is_kept_when_it_fits():
+    converter = ASCIIConverter()
+    img = make_image()
+    width, lines, _ = fit_width(converter, img, 40, max_chars=10 ** 6)
+    assert width == 40
+    assert lines == converter.convert_to_ascii(img, 40)
+
+
+def test_characters_are_counted_separately_from_bytes():
+    converter = ASCIIConverter(glyphs='blocks')
+    img = make_image()
+    _, lines, size = fit_width(converter, img, 40, max_chars=10 ** 6)
+    assert size == rendered_size(lines, count_bytes=False) < rendered_size(lines)
+
+
+def test_budget_smaller_than_one_row_is_reported():
+    # Narrow widths of this wide image round to a grid with no rows
+    img = make_image((600, 100))
+    with pytest.raises(ValueError, match='Even a 1-column render'):
+        fit_width(ASCIIConverter(), img, 300, max_chars=1)
+
+
+def test_real_renders_settle_without_trying_every_width():
+    converter = ASCIIConverter()
+    img = make_image()
+    tried = []
+
+    def render(width):
+        tried.append(width)
+        # Pretend direct renders are much larger than the estimate
+        return converter.convert_to_ascii(img, width) * 4
+
+    budget = rendered_size(converter.convert_to_ascii(img, 50))
+    width, lines, size = fit_width(converter, img, 60, max_bytes=budget, render=render)
+    assert size <= budget
+    assert lines == render(width)
+    assert len(tried) <= 8
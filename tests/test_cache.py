@@ -0,0 +1,70 @@
+import os
+import threading
+
+from high_res_ascii_painter.cache import RenderCache, render_params
+
+
+def test_counters_survive_concurrent_lookups(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    cache.put('ab' * 32, ['hit'])
+
+    def look_up():
+        for i in range(200):
+            cache.get('ab' * 32 if i % 2 else 'cd' * 32)
+
+    threads = [threading.Thread(target=look_up) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (cache.hits, cache.misses) == (800, 800)
+    assert cache.save_stats() == {'hits': 800, 'misses': 800}
+
+
+def test_key_depends_on_source_bytes_and_every_parameter(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    params = render_params(60)
+    key = cache.make_key(b'image', params)
+    assert key == cache.make_key(b'image', render_params(60))
+    assert key != cache.make_key(b'other', params)
+    for changed in (render_params(61), render_params(60, trim=True), render_params(60, use_color=True),
+                    render_params(60, glyphs='ascii'), render_params(60, tone='natural'),
+                    render_params(60, dither='bayer'), render_params(60, mode='braille')):
+        assert cache.make_key(b'image', changed) != key
+
+
+def test_entries_round_trip(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    cache.put('ab' * 32, ['  @@', '', '::  '])
+    cache.put('cd' * 32, [])
+    assert cache.get('ab' * 32) == ['  @@', '', '::  ']
+    assert cache.get('cd' * 32) == []
+    assert cache.get('ef' * 32) is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=350)
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, ['x' * 99])
+        # Distinct modification times, oldest first
+        os.utime(cache._entry_path(key), (age, age))
+    cache.get(keys[0])
+
+    cache.put('ff' * 32, ['x' * 99])
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+    assert cache.get('ff' * 32) is not None
+
+
+def test_partially_consumed_renders_are_not_stored(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    lines = cache.put_iter('ab' * 32, iter(['one', 'two', 'three']))
+    assert next(lines) == 'one'
+    lines.close()
+    assert cache.get('ab' * 32) is None
+    assert list(cache.put_iter('ab' * 32, iter(['one', 'two']))) == ['one', 'two']
+    assert cache.get('ab' * 32) == ['one', 'two']
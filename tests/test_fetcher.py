@@ -0,0 +1,62 @@
+import os
+
+from high_res_ascii_painter.fetcher import HTTPCache, fetch_url
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b'', headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(headers or {})
+        return self.responses.pop(0)
+
+
+class EvictingCache(HTTPCache):
+    """Loses the stored body right after the lookup, as a concurrent eviction would"""
+
+    def lookup(self, url):
+        meta = super().lookup(url)
+        os.unlink(self._paths(url)[1])
+        return meta
+
+
+def test_not_modified_is_served_from_the_cache(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    cache.store('http://x/a.png', {'ETag': '"1"', 'Content-Type': 'image/png'}, b'stored')
+    session = FakeSession(FakeResponse(304))
+    assert fetch_url('http://x/a.png', session, cache) == (b'stored', 'image/png')
+    assert session.requests == [{'If-None-Match': '"1"'}]
+
+
+def test_body_evicted_after_lookup_is_downloaded_again(tmp_path):
+    cache = EvictingCache(str(tmp_path))
+    cache.store('http://x/a.png', {'ETag': '"1"', 'Content-Type': 'image/png'}, b'stored')
+    session = FakeSession(FakeResponse(304),
+                          FakeResponse(200, b'fresh', {'ETag': '"2"', 'Content-Type': 'image/png'}))
+    assert fetch_url('http://x/a.png', session, cache) == (b'fresh', 'image/png')
+    # The retry carries no validators
+    assert session.requests[1] == {}
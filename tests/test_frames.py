@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from high_res_ascii_painter.ascii_converter import ASCIIConverter
+from high_res_ascii_painter.config import FRAME_CODECS
+from high_res_ascii_painter.frames import FrameReader, FrameWriter
+from high_res_ascii_painter.painter import print_frame_file
+
+
+def sample_images():
+    rng = np.random.default_rng(1)
+    for seed in range(3):
+        arr = rng.integers(0, 256, size=(40, 64, 3), dtype=np.uint8)
+        # Dark borders so trimmed rows end up with different lengths
+        arr[:, :8 * (seed + 1)] = 0
+        arr[:6] = 0
+        yield Image.fromarray(arr, 'RGB')
+
+
+@pytest.mark.parametrize('codec', FRAME_CODECS)
+@pytest.mark.parametrize('options', [
+    {},
+    {'use_color': True},
+    {'use_color': True, 'palette': '256'},
+    {'use_color': True, 'color_bits': 5},
+])
+@pytest.mark.parametrize('trim', [False, True])
+def test_frames_render_like_the_converter(tmp_path, codec, options, trim):
+    converter = ASCIIConverter(**options)
+    path = str(tmp_path / 'frames.hraf')
+    expected = []
+    with FrameWriter.for_converter(path, converter, codec) as writer:
+        for i, img in enumerate(sample_images()):
+            indices, arr_color, row_lengths = converter.convert_to_cells(img, 48, trim)
+            expected.append((converter.render_lines(indices, arr_color, row_lengths), 40 * i))
+            writer.write(indices, arr_color, row_lengths, duration=40 * i)
+
+    with FrameReader(path) as reader:
+        assert len(reader) == len(expected)
+        assert reader.density == converter.density
+        # Frames are read out of order to exercise the index
+        for i in reversed(range(len(reader))):
+            lines, duration = expected[i]
+            assert reader.render(i) == lines
+            assert reader[i].duration == duration
+
+
+def test_unfinished_and_foreign_files_are_rejected(tmp_path):
+    converter = ASCIIConverter()
+    indices, arr_color, row_lengths = converter.convert_to_cells(next(sample_images()), 32)
+    path = tmp_path / 'frames.hraf'
+    with FrameWriter.for_converter(str(path), converter) as writer:
+        writer.write(indices, arr_color, row_lengths)
+    data = path.read_bytes()
+
+    for name, content in (('truncated.hraf', data[:-4]), ('empty.hraf', b'x'),
+                          ('foreign.hraf', b'GIF89a' + data[6:])):
+        bad = tmp_path / name
+        bad.write_bytes(content)
+        with pytest.raises(ValueError, match='not a complete .hraf file'):
+            FrameReader(str(bad))
+
+
+def test_frame_number_past_the_end_is_an_error(tmp_path, capsys):
+    converter = ASCIIConverter()
+    path = str(tmp_path / 'frames.hraf')
+    with FrameWriter.for_converter(path, converter) as writer:
+        for img in sample_images():
+            writer.write(*converter.convert_to_cells(img, 32))
+
+    with pytest.raises(SystemExit) as exc:
+        print_frame_file(SimpleNamespace(frame=3, output=None), path)
+    assert exc.value.code == 1
+    assert capsys.readouterr().out == f"Error: {path} has 3 frames, no frame 3\n"
+
+    print_frame_file(SimpleNamespace(frame=2, output=None), path)
+    with FrameReader(path) as reader:
+        assert capsys.readouterr().out.splitlines() == reader.render(2)
@@ -0,0 +1,31 @@
+import numpy as np
+
+from high_res_ascii_painter.ascii_converter import ASCIIConverter
+from high_res_ascii_painter.config import BRIGHTNESS_OFFSET, DENSITY_STRING, GAMMA_CORRECTION
+from high_res_ascii_painter.glyphs import build_glyph_lut
+
+
+def legacy_index(p, n=len(DENSITY_STRING)):
+    """The original per-pixel mapping, including its uint8 brightness wrap-around"""
+    p = (int(p) + BRIGHTNESS_OFFSET) % 256
+    k = int(np.power(p / 255.0, GAMMA_CORRECTION) * (n - 1))
+    return n - 1 - min(k, n - 1)
+
+
+def test_table_matches_the_per_pixel_mapping_for_every_gray_value():
+    lut = build_glyph_lut(len(DENSITY_STRING))
+    assert lut.dtype == np.uint8
+    assert lut.tolist() == [legacy_index(p) for p in range(256)]
+
+
+def test_mapped_rows_match_the_per_pixel_loop():
+    converter = ASCIIConverter()
+    arr = np.random.default_rng(0).integers(0, 256, size=(23, 41), dtype=np.uint8)
+    identity = np.arange(256, dtype=np.uint8)
+
+    indices = converter.map_to_indices(arr, identity)
+    lines = converter.render_lines(indices, None)
+
+    expected = [''.join(DENSITY_STRING[legacy_index(p)] for p in row) for row in arr]
+    assert lines == expected
+    assert '\n'.join(lines).encode('utf-8') == '\n'.join(expected).encode('utf-8')
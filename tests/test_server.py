@@ -0,0 +1,71 @@
+import json
+import queue
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from high_res_ascii_painter.cli import ArgumentParser
+from high_res_ascii_painter.server import RenderRequestHandler, RenderService, RequestError, parse_request
+
+
+@pytest.mark.parametrize('extra', [
+    ['--variants', '20,30'], ['--tiled'], ['--watch'], ['--loop'], ['--frame', '0'],
+    ['--clear-cache'], ['--cache-stats'], ['--output', 'out.txt'], ['--max-bytes', '100'],
+])
+def test_cli_only_options_are_rejected(extra):
+    with pytest.raises(RequestError, match='not supported by the server'):
+        parse_request({'args': ['image.png', '30'] + extra})
+
+
+@pytest.mark.parametrize('source', ['big.npy', 'frames.HRAF'])
+def test_non_image_sources_are_rejected(source):
+    with pytest.raises(RequestError, match='not supported by the server'):
+        parse_request({'args': [source, '30']})
+
+
+@pytest.mark.parametrize('argv, message', [
+    ([], 'No image given'),
+    (['--help'], '--help'),
+    (['image.png', '--palette', 'nope'], "Unknown palette 'nope'"),
+    (['image.png', '--color-bits'], 'requires a value'),
+])
+def test_parse_errors_are_raised(argv, message, capsys):
+    with pytest.raises(RequestError, match=message):
+        parse_request({'args': argv})
+    assert capsys.readouterr().out == ''
+
+
+def test_source_index_skips_equal_option_values():
+    args = ArgumentParser().parse_args(['ascii-painter', '--output-dir', 'a.png', 'a.png', '30'])
+    assert args.img_source == 'a.png'
+    assert args.source_index == 3
+
+
+def test_full_queue_rejects_submissions():
+    service = RenderService(workers=0, queue_size=1)
+    args, _ = parse_request({'args': ['image.png', '30']})
+    service.submit(args)
+    with pytest.raises(queue.Full):
+        service.submit(args)
+    assert service.status()['rejected'] == 1
+
+
+def test_full_queue_answers_503():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), RenderRequestHandler)
+    httpd.service = RenderService(workers=0, queue_size=1)
+    httpd.service.submit(parse_request({'args': ['image.png', '30']})[0])
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        request = urllib.request.Request(f"http://127.0.0.1:{httpd.server_address[1]}/render",
+                                         data=json.dumps({'args': ['image.png', '30']}).encode())
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(request, timeout=5)
+        assert error.value.code == 503
+        assert error.value.headers['Retry-After'] == '1'
+    finally:
+        httpd.shutdown()
+        httpd.server_close()